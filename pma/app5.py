@@ -1,25 +1,28 @@
 
-import openai
 import streamlit as st
-import bcrypt
+from collections import OrderedDict
+from concurrent.futures import as_completed
 from datetime import datetime, timedelta, time as dtime
+import html
 import os
-from openai import OpenAI
 from dotenv import load_dotenv
-from database import Database
-import base64
+from importer import import_memories
+from passwords import check_password
+from pool import PoolError
+from chat_history import ChatHistory, llm_summarizer
+from memory_index import MEMORY_INDEX, format_context
+from llm import ReplyTimeout, stream_completion
+from llm_cache import REPLY_CACHE, cache_key, context_hash
+from tracing import TRACER, traced
+import resources
 import streamlit.components.v1 as components
 
-# Load environment variables (optional)
-client = openai.OpenAI(
-    api_key="b50F06IeU8hnwtnI513qEhNO6QGug9KVcOJ4vUbsNCI",  # replace with your actual Poe key
-    base_url="https://api.poe.com/v1",
-)
 st.set_page_config(page_title="🧐 Personal Memory Assistant", layout="wide")
 
-db = Database()
-conn = db.connect()
-if not conn:
+# built once per process and shared by every rerun/session, see resources.py; the LLM client
+# is fetched where it is used, so a missing API key only disables the chat
+db = resources.database()
+if not resources.REGISTRY.healthy("db"):
     st.error("🚨 Could not connect to MySQL. Check credentials.")
     st.stop()
 
@@ -37,10 +40,18 @@ if 'memory_type' not in st.session_state:
 
 def set_page(name):
     st.session_state['page'] = name
+    # drop loaded search pages so coming back to search shows fresh data
+    st.session_state.pop('search_results', None)
 
 def authenticate(username, password):
     user = db.get_user(username)
-    if user and bcrypt.checkpw(password.encode(), user['password_hash'].encode()):
+    if not user:
+        return False
+    ok, new_hash = check_password(password, user['password_hash'])
+    if ok:
+        if new_hash:
+            # stored with an older work factor
+            db.update_password_hash(user['id'], user['username'], new_hash)
         st.session_state['user_id'] = user['id']
         st.session_state['username'] = user['username']
         set_page('home')
@@ -50,8 +61,10 @@ def authenticate(username, password):
 def logout():
     st.session_state['user_id'] = None
     st.session_state['username'] = None
+    st.session_state.pop('attachment_cache', None)
     set_page('login')
 
+@traced()
 def login_page():
     st.title("🔐 Welcome to Personal Memory Assistant")
 
@@ -81,15 +94,18 @@ def login_page():
                 else:
                     st.error("❌ Username exists")
 
+@traced()
 def home_page():
     st.sidebar.success(f"👋 Hi, {st.session_state['username']}")
     if st.sidebar.button("🏠 Home"): set_page("home")
     if st.sidebar.button("🧠 Add Memory"): set_page("add_memory")
     if st.sidebar.button("🔎 Search"): set_page("search_memory")
     if st.sidebar.button("👪 Add Family Member"): set_page("add_family")
+    if st.sidebar.button("📥 Import Memories"): set_page("import_memories")
     if st.sidebar.button("chatBot assistant"): set_page("chat_with_bot")
     if st.sidebar.button("🗑️ Clear All Memories"):
         if db.delete_all_user_data(st.session_state['user_id']):
+            st.session_state.pop('attachment_cache', None)
             st.sidebar.success("✅ All memories deleted")
         else:
             st.sidebar.error("❌ Failed to delete memories")
@@ -105,38 +121,78 @@ def home_page():
         search_memory()
     elif st.session_state['page'] == "add_family":
         add_family()
+    elif st.session_state['page'] == "import_memories":
+        import_page()
     elif st.session_state['page'] == "chat_with_bot":
         chat_with_bot()
         
 
+CHAT_MODEL = "API-Integrator"  # Ensure this is your valid Poe model
+RETRIEVAL_K = 5
+
+@traced()
 def chat_with_bot():
     st.subheader("🤖 Poe AI Chat Assistant")
 
     if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+        # only the last few turns are sent verbatim, older ones travel as a running summary
+        st.session_state.chat_history = ChatHistory(summarizer=llm_summarizer(resources.llm_client, CHAT_MODEL))
+    history = st.session_state.chat_history
 
     user_prompt = st.chat_input("Ask anything...")
 
     if user_prompt:
-        st.session_state.chat_history.append({"role": "user", "content": user_prompt})
+        history.append("user", user_prompt)
 
         with st.chat_message("user"):
             st.markdown(user_prompt)
 
+        # any click (e.g. Stop) reruns the script, which interrupts the stream below
+        st.button("⏹️ Stop generating")
+        parts = []
+        complete = False
         try:
-            response = client.chat.completions.create(
-                model="API-Integrator",  # Ensure this is your valid Poe model
-                messages=st.session_state.chat_history,
-            )
-
-            bot_reply = response.choices[0].message.content
-            st.session_state.chat_history.append({"role": "assistant", "content": bot_reply})
+            # ground the answer in the few saved memories most similar to the question
+            with TRACER.span("retrieval", k=RETRIEVAL_K):
+                relevant = MEMORY_INDEX.search(db, st.session_state['user_id'], user_prompt, k=RETRIEVAL_K)
+            messages = history.build(system=format_context(relevant) if relevant else None)
+            key = cache_key(CHAT_MODEL, messages, st.session_state['user_id'], context_hash(relevant))
 
             with st.chat_message("assistant"):
-                st.markdown(bot_reply)
-
+                with TRACER.span("reply_cache.get") as span:
+                    cached = REPLY_CACHE.get(key)
+                    if span is not None:
+                        span.set(hit=cached is not None)
+                if cached is not None:
+                    parts.append(cached)
+                    st.markdown(cached)
+                else:
+                    placeholder = st.empty()
+                    with TRACER.span("llm.stream", model=CHAT_MODEL, messages=len(messages)) as span:
+                        for delta in stream_completion(resources.llm_client(), CHAT_MODEL, messages):
+                            if span is not None and not parts:
+                                span.set(first_token_ms=round(span.duration_ms, 1))
+                            parts.append(delta)
+                            placeholder.markdown("".join(parts) + "▌")
+                        placeholder.markdown("".join(parts))
+                        if span is not None:
+                            span.set(chunks=len(parts))
+                    complete = True
+
+        except ReplyTimeout as e:
+            st.warning(f"⏱️ {e}")
         except Exception as e:
             st.error(f"❌ Error: {e}")
+        finally:
+            # keep whatever arrived, even if the reply was stopped or timed out
+            if parts:
+                history.append("assistant", "".join(parts))
+            if complete and parts:
+                REPLY_CACHE.put(key, st.session_state['user_id'], "".join(parts))
+
+    stats = REPLY_CACHE.stats()
+    st.caption(f"💾 Reply cache: {stats['hits']} hits / {stats['misses']} misses "
+               f"({stats['hit_rate']:.0%}), {stats['entries']} entries")
 
            
 # Then call this function somewhere in your Streamlit app
@@ -144,52 +200,138 @@ def chat_with_bot():
 if st.session_state.get("logged_in"):
     chat_with_bot()
 
+@traced()
 def add_family():
     st.title("👪 Add Family Member")
+    user_id = st.session_state['user_id']
     fam_username = st.text_input("Enter existing username of your family member")
-    if st.button("Add Family Member"):
-        if db.link_family_member(st.session_state['user_id'], fam_username):
+    add_clicked = st.button("Add Family Member")
+    # who linked to us doesn't depend on the link we may be adding, so fetch it meanwhile
+    linked_future = db.submit(db.get_linked_to_user, user_id)
+    if add_clicked:
+        if db.link_family_member(user_id, fam_username):
             st.success(f"✅ Linked to {fam_username} successfully")
         else:
             st.warning(f"⚠️ Could not link to {fam_username}. Maybe already linked or user does not exist.")
 
-    linked_users = db.get_linked_to_user(st.session_state['user_id'])
+    linked_users = linked_future.result()
     if linked_users:
         st.subheader("🔗 Linked By")
         for user in linked_users:
             st.markdown(f"- {user['username']}")
 
+@traced()
+def import_page():
+    st.title("📥 Import Memories")
+    st.caption("CSV with title, content, data_type, date (YYYY-MM-DD), time (HH:MM) columns, or a JSON array / JSON Lines file with the same keys.")
+    upload = st.file_uploader("Export file", type=["csv", "json", "jsonl"])
+    if upload and st.button("Import"):
+        fmt = "csv" if upload.name.lower().endswith(".csv") else "json"
+        try:
+            with st.spinner("Importing..."):
+                result = import_memories(db, st.session_state['user_id'], upload, fmt)
+        except ValueError as e:
+            st.error(f"❌ Could not read file: {e}")
+            return
+        st.success(f"✅ Imported {result['inserted']} memories")
+        if result['duplicates'] or result['skipped']:
+            st.info(f"Skipped {result['duplicates']} duplicates and {result['skipped']} incomplete rows")
+
+UPCOMING_DAYS = 7
+
+@traced()
 def show_dashboard():
     st.title("📊 Dashboard")
+    user_id = st.session_state['user_id']
     now = datetime.now()
-    all_data = db.get_user_data(st.session_state['user_id'])
 
     st.subheader("🔔 Reminders")
-    for r in all_data:
-        if r['date'] and r.get('time'):
-            reminder_dt = datetime.combine(r['date'], datetime.strptime(r['time'], "%H:%M").time())
-            time_diff = (now - reminder_dt).total_seconds()
-            if 0 <= time_diff <= 60 and r['id'] not in st.session_state['reminder_shown']:
-                st.warning(f"🔔 Alert: {r['title']} - {r['data_type']} - Due now!")
-                st.session_state['reminder_shown'].add(r['id'])
-                st.toast(f"🔔 WhatsApp-style Reminder: {r['title']} is due now!", icon="🔔")
-                components.html(f"""
-                <script>
-                    var msg = new SpeechSynthesisUtterance("Reminder alert: {r['title']} is due now.");
-                    window.speechSynthesis.speak(msg);
-                </script>
-                """, height=0)
-
+    alerts_box = st.container()
+    upcoming_box = st.container()
     st.subheader("🕒 Recent Memories")
-    for item in all_data[:5]:
-        st.markdown(f"**{item['title']}** - {item['data_type']} - {item['date'] or 'No date'}")
+    recent_box = st.container()
+
+    # the sections are independent: query them concurrently and fill each one as its result arrives
+    sections = {
+        db.submit(db.get_pending_reminders, user_id): (alerts_box, show_reminder_alerts),
+        db.submit(db.get_due_reminders, user_id, now, now + timedelta(days=UPCOMING_DAYS), limit=10): (upcoming_box, show_upcoming),
+        db.submit(db.get_memory_summaries, user_id, limit=5, with_content=True): (recent_box, show_recent),
+    }
+    for future in as_completed(sections):
+        box, render = sections[future]
+        with box:
+            render(future.result())
+
+@traced()
+def show_reminder_alerts(events):
+    # reminders are detected by scheduler.py; here we only pick up what it emitted for us
+    for r in events:
+        if r['id'] in st.session_state['reminder_shown']:
+            continue
+        st.warning(f"🔔 Alert: {r['title']} - {r['data_type']} - Due {r['due_at']:%Y-%m-%d %H:%M}!")
+        st.session_state['reminder_shown'].add(r['id'])
+        st.toast(f"🔔 WhatsApp-style Reminder: {r['title']} is due now!", icon="🔔")
+        components.html(f"""
+        <script>
+            var msg = new SpeechSynthesisUtterance("Reminder alert: {r['title']} is due now.");
+            window.speechSynthesis.speak(msg);
+        </script>
+        """, height=0)
+    db.mark_reminders_delivered(st.session_state['user_id'], [r['id'] for r in events])
+
+@traced()
+def show_upcoming(upcoming):
+    if upcoming:
+        st.caption(f"Upcoming in the next {UPCOMING_DAYS} days")
+        for r in upcoming:
+            st.markdown(f"- ⏰ {r['remind_at']:%a %d %b %H:%M} - **{memory_title(r)}** ({r['data_type']})")
+    else:
+        st.caption("No upcoming reminders")
+
+@traced()
+def show_recent(items):
+    for item in items:
+        st.markdown(f"**{memory_title(item)}** - {item['data_type']} - {item['date'] or 'No date'}")
         st.caption(item['content'])
-        if item.get('voice_note'):
-            st.audio(base64.b64decode(item['voice_note']), format='audio/wav')
-        if item.get('file_data'):
-            st.download_button("📥 Download File", data=base64.b64decode(item['file_data']), file_name=item['file_name'])
+        show_attachments(item, "dash")
         st.markdown("---")
 
+def memory_title(item):
+    return item['title'] + (" (Shared from family)" if item.get('shared') else "")
+
+ATTACHMENT_CACHE_SIZE = 16
+
+def load_attachment(memory_id):
+    # bytes are cached per memory id for the session, newest last, so a loaded card
+    # doesn't hit the blob store again on every rerun
+    cache = st.session_state.setdefault('attachment_cache', OrderedDict())
+    if memory_id in cache:
+        cache.move_to_end(memory_id)
+        return cache[memory_id]
+    att = db.get_attachment(memory_id)
+    cache[memory_id] = att
+    while len(cache) > ATTACHMENT_CACHE_SIZE:
+        cache.popitem(last=False)
+    return att
+
+def show_attachments(item, key_prefix):
+    # nothing is read from the blob store until the user asks for it
+    if not item['has_attachment']:
+        return
+    with st.expander("📎 Attachments"):
+        cached = item['id'] in st.session_state.get('attachment_cache', {})
+        if not cached and not st.button("Load", key=f"{key_prefix}_load_{item['id']}"):
+            return
+        att = load_attachment(item['id'])
+        if not att or not (att['voice_note'] or att['file_data']):
+            st.caption("Attachment no longer available")
+            return
+        if att['voice_note']:
+            st.audio(att['voice_note'], format=att['voice_mime'] or 'audio/wav')
+        if att['file_data']:
+            st.download_button("📥 Download File", data=att['file_data'], file_name=att['file_name'], mime=att['file_mime'], key=f"{key_prefix}_dl_{item['id']}")
+
+@traced()
 def add_memory():
     st.title("📝 Add Memory")
 
@@ -236,12 +378,12 @@ def add_memory():
         if saved:
             if title and content and valid:
                 final_content = content + extra_info
-                voice_data = base64.b64encode(voice_note.read()).decode() if voice_note else None
-                file_data = base64.b64encode(file.read()).decode() if file else None
+                voice_data = voice_note.getvalue() if voice_note else None
+                file_data = file.getvalue() if file else None
                 file_name = file.name if file else None
 
-                if not db.memory_exists(st.session_state['user_id'], dtype, title, final_content, date, time.strftime("%H:%M")):
-                    db.add_data(st.session_state['user_id'], dtype, title, final_content, date, time.strftime("%H:%M"), voice_data, file_data, file_name)
+                if db.add_data(st.session_state['user_id'], dtype, title, final_content, date, time.strftime("%H:%M"), voice_data, file_data, file_name,
+                               voice_mime=voice_note.type if voice_note else None, file_mime=file.type if file else None):
                     st.success("✅ Memory added with reminder")
                     st.toast("⏰ Reminder has been set", icon="⏰")
                 else:
@@ -249,34 +391,96 @@ def add_memory():
             else:
                 st.warning("Please fill all required fields.")
 
+SEARCH_PAGE_SIZE = 50
+
+def fetch_search_page(user_id, query, last=None):
+    before_id = last['id'] if last else None
+    if query:
+        return db.search(user_id, query, limit=SEARCH_PAGE_SIZE, before_id=before_id,
+                         before_score=last.get('score') if last else None)
+    return db.get_memory_summaries(user_id, limit=SEARCH_PAGE_SIZE, with_content=True, before_id=before_id)
+
+@traced()
 def search_memory():
     st.title("🔍 Search & Manage Memories")
     query = st.text_input("Search by keyword or date")
-    all_data = db.get_user_data(st.session_state['user_id'])
-
-    results = [
-        r for r in all_data
-        if query.lower() in r['title'].lower() or query.lower() in r['content'].lower()
-        or (r['date'] and query in str(r['date']))
-    ] if query else all_data
+    user_id = st.session_state['user_id']
+
+    # loaded pages are kept in the session, "Load more" only fetches the next page. They are
+    # tied to the user's result cache version, which every write this user can see bumps (adds,
+    # deletes, imports, a family member sharing a memory), so stale pages are dropped.
+    version = db.result_cache.version(user_id) if db.result_cache is not None else None
+    state = st.session_state.get('search_results')
+    if not state or state['query'] != query or state['version'] != version:
+        rows = fetch_search_page(user_id, query)
+        state = {'query': query, 'rows': rows, 'more': len(rows) == SEARCH_PAGE_SIZE, 'version': version}
+        st.session_state['search_results'] = state
+    results = state['rows']
 
     if results:
         for r in results:
-            st.markdown(f"**{r['title']}** - {r['data_type']} - {r['date'] or 'No date'}")
+            st.markdown(f"**{memory_title(r)}** - {r['data_type']} - {r['date'] or 'No date'}")
             st.caption(r['content'])
-            if r.get('voice_note'):
-                st.audio(base64.b64decode(r['voice_note']), format='audio/wav')
-            if r.get('file_data'):
-                st.download_button("📥 Download File", data=base64.b64decode(r['file_data']), file_name=r['file_name'])
+            show_attachments(r, "search")
             if st.button(f"❌ Delete {r['title']}", key=f"del_{r['id']}"):
-                db.delete_memory(r['id'])
-                st.success("✅ Deleted")
+                if db.delete_memory(r['id'], user_id):
+                    st.success("✅ Deleted")
+                else:
+                    st.warning("⚠️ This memory was already deleted")
+                st.session_state.get('attachment_cache', {}).pop(r['id'], None)
+                st.session_state.pop('search_results', None)
                 st.rerun()
             st.markdown("---")
+        if state['more'] and st.button("⬇️ Load more"):
+            rows = fetch_search_page(user_id, query, results[-1])
+            state['rows'] = results + rows
+            state['more'] = len(rows) == SEARCH_PAGE_SIZE
+            st.rerun()
     else:
         st.info("🔍 No matching memories found.")
 
-if st.session_state['user_id']:
-    home_page()
-else:
-    login_page()
+TRACE_HISTORY = 10
+
+def show_trace_panel():
+    # waterfall of this session's recent reruns; only offered when tracing is on (PMA_TRACE=1)
+    traces = st.session_state.get('traces')
+    if not traces or not st.sidebar.checkbox("🧭 Show trace"):
+        return
+    with st.expander("🧭 Rerun trace", expanded=True):
+        labels = [f"{datetime.fromtimestamp(t.root.start):%H:%M:%S} · {t.root.attrs.get('page')} · {t.root.duration_ms:.0f} ms"
+                  + (f" · {t.root.attrs['error']}" if 'error' in t.root.attrs else "") for t in traces]
+        choice = st.selectbox("Rerun", range(len(traces)), format_func=lambda i: labels[i], index=len(traces) - 1)
+        trace = traces[choice]
+        total = max(trace.root.duration_ms, 0.001)
+        bars = []
+        for row in trace.waterfall():
+            left = row['offset_ms'] / total * 100
+            width = max(row['duration_ms'] / total * 100, 0.3)
+            details = html.escape(", ".join(f"{k}={v}" for k, v in row['attrs'].items()), quote=True)
+            bars.append(
+                f"<div style='display:flex;font:12px monospace;line-height:18px'>"
+                f"<div style='width:34%;padding-left:{row['depth'] * 12}px;white-space:nowrap;overflow:hidden' "
+                f"title='{details}'>{html.escape(row['name'])}</div>"
+                f"<div style='width:54%;position:relative'><div style='position:absolute;left:{left:.2f}%;width:{width:.2f}%;"
+                f"height:12px;top:3px;background:{'#e0554f' if 'error' in row['attrs'] else '#4f8be0'}'></div></div>"
+                f"<div style='width:12%;text-align:right'>{row['duration_ms']:.1f} ms</div></div>")
+        st.markdown("".join(bars), unsafe_allow_html=True)
+
+trace = None
+try:
+    with TRACER.trace("rerun", page=st.session_state['page']) as trace:
+        if st.session_state['user_id']:
+            home_page()
+        else:
+            login_page()
+except PoolError:
+    # every pooled connection is busy; the rest of the page is skipped until the user retries
+    st.warning("⏳ The app is busy right now, please retry in a moment.")
+    if st.button("🔄 Retry"):
+        st.rerun()
+finally:
+    # kept even when the rerun ended in st.rerun(), so the panel can show it next time
+    if trace is not None:
+        st.session_state.setdefault('traces', []).append(trace)
+        del st.session_state['traces'][:-TRACE_HISTORY]
+show_trace_panel()
@@ -0,0 +1,139 @@
+# ✅ backends.py - storage backends behind Database: MySQL, or embedded SQLite in WAL mode
+# Both hand out connections with the mysql.connector surface the pool and Database use
+# (cursor(prepared=, dictionary=), commit/rollback, in_transaction, ping, is_connected), so
+# queries are written once with %s placeholders; the few dialect differences live here.
+import functools
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+
+BACKEND = os.getenv("PMA_DB_BACKEND", "mysql")
+SQLITE_PATH = os.getenv("PMA_SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_assistant.sqlite3"))
+
+
+class MySQLBackend:
+    name = "mysql"
+    # MySQL treats backslash as the LIKE escape character by default
+    like_escape = ""
+
+    def __init__(self, **config):
+        import mysql.connector
+        self.config = config
+        self.driver = mysql.connector
+        self.Error = mysql.connector.Error
+        self.IntegrityError = mysql.connector.IntegrityError
+
+    def connect(self):
+        return self.driver.connect(**self.config)
+
+    def union_branch(self, sql):
+        # one side of a UNION ALL that keeps its own ORDER BY / LIMIT
+        return f"({sql})"
+
+    def fulltext(self):
+        # -> (score expression, filter expression); each takes the fulltext_query() string once
+        match = "MATCH(title, content) AGAINST (%s IN BOOLEAN MODE)"
+        return match, match
+
+    def fulltext_query(self, words):
+        # boolean mode: every word must match, the last one as a prefix
+        return " ".join(f"+{w}*" if i == len(words) - 1 else f"+{w}" for i, w in enumerate(words))
+
+
+# --- SQLite: mysql.connector-shaped connection and cursor over the sqlite3 module ---
+
+REWRITES = [
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\s+id\s*=\s*id\b", re.I), "ON CONFLICT DO NOTHING"),
+]
+
+
+@functools.lru_cache(maxsize=512)
+def sqlite_sql(sql):
+    # %s placeholders and the MySQL idioms Database uses -> SQLite
+    for pattern, replacement in REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return sql.replace("%s", "?")
+
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        return super().execute(sqlite_sql(sql), tuple(params))
+
+    def executemany(self, sql, seq_of_params):
+        return super().executemany(sqlite_sql(sql), (tuple(p) for p in seq_of_params))
+
+
+class SQLiteConnection(sqlite3.Connection):
+    def cursor(self, prepared=False, dictionary=False):
+        # sqlite3 already caches compiled statements per connection, so prepared is a no-op
+        cur = super().cursor(SQLiteCursor)
+        if dictionary:
+            cur.row_factory = _dict_row
+        return cur
+
+    def ping(self, reconnect=False):
+        super().execute("SELECT 1").fetchone()
+
+    def is_connected(self):
+        try:
+            self.ping()
+            return True
+        except sqlite3.Error:
+            return False
+
+
+sqlite3.register_adapter(date, lambda v: v.isoformat())
+sqlite3.register_adapter(datetime, lambda v: v.isoformat(" "))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter("DATETIME", lambda b: datetime.fromisoformat(b.decode()))
+
+
+class SQLiteBackend:
+    name = "sqlite"
+    like_escape = " ESCAPE '\\'"
+    Error = sqlite3.Error
+    IntegrityError = sqlite3.IntegrityError
+
+    def __init__(self, path=SQLITE_PATH, busy_timeout=10.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, factory=SQLiteConnection,
+                               detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        # WAL: readers never block the writer and each other; NORMAL sync is durable across app crashes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def union_branch(self, sql):
+        # SQLite doesn't allow ORDER BY / LIMIT on a bare compound member, a subquery does
+        return f"SELECT * FROM ({sql})"
+
+    def fulltext(self):
+        # user_data_fts is an external-content FTS5 table over user_data(title, content);
+        # bm25() is lower for better matches, negate it so higher scores rank first like MySQL
+        score = "(SELECT -bm25(user_data_fts) FROM user_data_fts WHERE user_data_fts MATCH %s AND rowid = user_data.id)"
+        where = "id IN (SELECT rowid FROM user_data_fts WHERE user_data_fts MATCH %s)"
+        return score, where
+
+    def fulltext_query(self, words):
+        # implicit AND between quoted terms, the last one as a prefix
+        return " ".join(f'"{w}"*' if i == len(words) - 1 else f'"{w}"' for i, w in enumerate(words))
+
+
+def make_backend(name=None, config=None):
+    # config: mysql.connector.connect() arguments for MySQL
+    name = name or BACKEND
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "mysql":
+        return MySQLBackend(**(config or {}))
+    raise ValueError(f"Unknown database backend: {name}")
@@ -0,0 +1,331 @@
+# ✅ bench.py - microbenchmarks for Database against a seeded, throwaway database
+# It seeds a separate schema (memolink_bench by default, refuses the live PMA_DB_NAME), e.g.
+#   python bench.py --database memolink_bench --users 200 --memories 100000 --output bench.json
+# and compare two commits with `python bench.py ... --compare old.json`. `--sqlite bench.sqlite3`
+# runs the same suite hermetically against an embedded SQLite file instead.
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from backends import SQLiteBackend
+from blobstore import BlobStore
+from database import DB_CONFIG, Database
+from importer import MEMORY_TYPES
+from migrations import migrate
+from passwords import hash_password, shutdown
+
+SYLLABLES = ["ka", "vi", "ya", "mo", "ren", "tal", "sun", "dor", "lep", "quin", "bar", "ost", "el", "nim", "rua"]
+
+
+def vocabulary(rng, size=400):
+    # pronounceable words of 3+ characters so they are all indexed by the FULLTEXT parser
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))))
+    return sorted(words)
+
+
+class Generator:
+    def __init__(self, seed, run_id):
+        self.rng = random.Random(seed)
+        self.words = vocabulary(self.rng)
+        self.run_id = run_id
+        self.counter = 0
+
+    def text(self, n):
+        return " ".join(self.rng.choice(self.words) for _ in range(n))
+
+    def memory(self, user_id):
+        # the counter keeps every generated memory unique, so content_hash never collapses rows
+        self.counter += 1
+        day = date(2024, 1, 1) + timedelta(days=self.rng.randrange(730))
+        return {
+            'user_id': user_id,
+            'data_type': self.rng.choice(MEMORY_TYPES),
+            'title': f"{self.text(3)} {self.counter}",
+            'content': self.text(self.rng.randint(8, 40)),
+            'date': day if self.rng.random() < 0.5 else None,
+            'time': f"{self.rng.randrange(24):02d}:{self.rng.choice((0, 15, 30, 45)):02d}" if self.rng.random() < 0.2 else None,
+        }
+
+    def blob(self, size):
+        return self.rng.randbytes(size)
+
+
+def seed(db, gen, users, links_per_user, memories, attachment_ratio, attachment_bytes, chunk_size=1000):
+    # users share one cheap precomputed hash; nothing here measures bcrypt
+    hashed = hash_password("bench", rounds=4)
+    prefix = f"bench_{gen.run_id}_"
+    with db.pool.connection() as pc:
+        cursor = pc.conn.cursor()
+        cursor.executemany("INSERT INTO users (username, password_hash) VALUES (%s, %s)",
+                           [(f"{prefix}{i}", hashed) for i in range(users)])
+        cursor.execute("SELECT id FROM users WHERE username LIKE %s ORDER BY id", (prefix + "%",))
+        user_ids = [r[0] for r in cursor.fetchall()]
+        links = set()
+        for user_id in user_ids:
+            others = [u for u in gen.rng.sample(user_ids, min(links_per_user + 1, len(user_ids))) if u != user_id]
+            links.update((user_id, fam_id) for fam_id in others[:links_per_user])
+        if links:
+            cursor.executemany("INSERT INTO family_links (user_id, family_id) VALUES (%s, %s)", sorted(links))
+        pc.conn.commit()
+        cursor.close()
+
+    start = time.perf_counter()
+    result = db.add_data_bulk((gen.memory(gen.rng.choice(user_ids)) for _ in range(memories)), chunk_size=chunk_size)
+    seed_seconds = time.perf_counter() - start
+
+    attached = 0
+    if attachment_ratio > 0 and memories:
+        # a pool of distinct blobs referenced from a random sample of the seeded rows
+        digests = [(db.blobs.put(gen.blob(attachment_bytes)), f"attachment_{i}.bin") for i in range(32)]
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        with db.pool.connection() as pc:
+            cursor = pc.conn.cursor()
+            cursor.execute(f"SELECT id FROM user_data WHERE user_id IN ({placeholders})", user_ids)
+            ids = [r[0] for r in cursor.fetchall()]
+            chosen = gen.rng.sample(ids, int(len(ids) * attachment_ratio))
+            cursor.executemany(
+                "UPDATE user_data SET file_hash = %s, file_size = %s, file_mime = 'application/octet-stream', file_name = %s WHERE id = %s",
+                [(digest, attachment_bytes, name, memory_id) for memory_id, (digest, name) in
+                 ((m, gen.rng.choice(digests)) for m in chosen)])
+            pc.conn.commit()
+            cursor.close()
+            attached = len(chosen)
+    return {
+        'user_ids': user_ids,
+        'links': len(links),
+        'inserted': result['inserted'],
+        'attached': attached,
+        'seed_seconds': round(seed_seconds, 3),
+        'seed_rows_per_s': round(result['inserted'] / seed_seconds, 1) if seed_seconds else None,
+    }
+
+
+def sample_memories(db, user_ids, n, rng):
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    with db.pool.connection() as pc:
+        ids = [r[0] for r in db._fetchall(pc, f"SELECT id FROM user_data WHERE user_id IN ({placeholders})",
+                                          user_ids, dictionary=False)]
+        if not ids:
+            return []
+        chosen = rng.sample(ids, min(n, len(ids)))
+        cursor = pc.conn.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT user_id, data_type, title, content, date, time FROM user_data
+            WHERE id IN ({", ".join(["%s"] * len(chosen))})
+        """, chosen)
+        rows = cursor.fetchall()
+        cursor.close()
+    # time is stored as the "HH:MM" string add_data received, so rows feed memory_exists as-is
+    return rows
+
+
+def fan_out(db, user_ids):
+    # users ordered by how many family members see their memories
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    with db.pool.connection() as pc:
+        rows = db._fetchall(pc, f"""
+            SELECT family_id, COUNT(*) FROM family_links WHERE family_id IN ({placeholders})
+            GROUP BY family_id ORDER BY COUNT(*) DESC
+        """, user_ids, dictionary=False)
+    return rows
+
+
+def measure(fn, calls, warmup=3):
+    # fn(i) is called once per iteration; warmup iterations fill the pool's statement caches
+    for i in range(min(warmup, calls)):
+        fn(i)
+    timings = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        'n': len(ordered),
+        'min_ms': ms(ordered[0]),
+        'median_ms': ms(statistics.median(ordered)),
+        'p95_ms': ms(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]),
+        'max_ms': ms(ordered[-1]),
+        'mean_ms': ms(statistics.fmean(ordered)),
+        'ops_per_s': round(len(ordered) / sum(ordered), 1) if sum(ordered) else None,
+    }
+
+
+def run_benchmarks(db, gen, user_ids, iterations, attachment_bytes):
+    rng = gen.rng
+    results = {}
+    pick = lambda i: user_ids[rng.randrange(len(user_ids))]
+
+    results['get_user_data'] = measure(lambda i: db.get_user_data(pick(i)), iterations)
+    results['get_user_data_page50'] = measure(lambda i: db.get_user_data(pick(i), limit=50), iterations)
+    results['get_memory_summaries_page50'] = measure(lambda i: db.get_memory_summaries(pick(i), limit=50), iterations)
+
+    existing = sample_memories(db, user_ids, iterations, rng)
+    exists = lambda m: db.memory_exists(m['user_id'], m['data_type'], m['title'], m['content'], m['date'], m['time'])
+    if existing:
+        results['memory_exists_hit'] = measure(lambda i: exists(existing[i % len(existing)]), iterations)
+    missing = [gen.memory(pick(i)) for i in range(iterations)]
+    results['memory_exists_miss'] = measure(lambda i: exists(missing[i]), iterations)
+
+    terms = [rng.choice(gen.words) for _ in range(iterations)]
+    results['search_term'] = measure(lambda i: db.search(pick(i), terms[i]), iterations)
+    results['search_two_terms'] = measure(lambda i: db.search(pick(i), f"{terms[i]} {terms[-1 - i]}"), iterations)
+    results['search_date'] = measure(
+        lambda i: db.search(pick(i), (date(2024, 1, 1) + timedelta(days=rng.randrange(730))).isoformat()), iterations)
+
+    # writes: spread over the users with the widest family fan-out
+    audiences = fan_out(db, user_ids) or [(u, 0) for u in user_ids[:1]]
+    writers = [u for u, _ in audiences[:max(1, len(audiences) // 10)]]
+    # generated up front so the timings only cover the insert (3 extra rows for the warmup)
+    plain = [gen.memory(writers[i % len(writers)]) for i in range(iterations + 3)]
+    attached = [dict(gen.memory(writers[i % len(writers)]), file_data=gen.blob(attachment_bytes), file_name="bench.bin",
+                     file_mime="application/octet-stream") for i in range(iterations + 3)]
+    results['add_data_fan_out'] = measure(lambda i: db.add_data(**plain.pop()), iterations)
+    results['add_data_fan_out']['avg_audience'] = round(statistics.fmean(n for _, n in audiences[:len(writers)]), 2)
+    results['add_data_with_attachment'] = measure(lambda i: db.add_data(**attached.pop()), iterations)
+
+    # destructive, so last and on distinct users; warmup would wipe extra users for nothing
+    victims = rng.sample(user_ids, min(len(user_ids), iterations))
+    results['delete_all_user_data'] = measure(lambda i: db.delete_all_user_data(victims[i]), len(victims), warmup=0)
+    return results
+
+
+def cleanup(db, run_id):
+    prefix = f"bench_{run_id}_%"
+    with db.pool.connection() as pc:
+        user_ids = [r[0] for r in db._fetchall(pc, "SELECT id FROM users WHERE username LIKE %s", (prefix,), dictionary=False)]
+    for user_id in user_ids:
+        db.delete_all_user_data(user_id)
+    if user_ids:
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        with db.pool.connection() as pc:
+            cursor = pc.conn.cursor()
+            cursor.execute(f"DELETE FROM family_links WHERE user_id IN ({placeholders}) OR family_id IN ({placeholders})",
+                           user_ids + user_ids)
+            cursor.execute(f"DELETE FROM users WHERE id IN ({placeholders})", user_ids)
+            pc.conn.commit()
+            cursor.close()
+    return len(user_ids)
+
+
+def create_schema(config):
+    # the bench schema is throwaway, so make it on first use
+    import mysql.connector
+    conn = mysql.connector.connect(**{k: v for k, v in config.items() if k != "database"})
+    try:
+        conn.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{config['database']}`")
+    finally:
+        conn.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    # -> list of (benchmark, old median, new median) that got slower than tolerance allows
+    regressions = []
+    for name, new in results.items():
+        old = baseline.get('results', {}).get(name)
+        if old and old['median_ms'] and new['median_ms'] > old['median_ms'] * (1 + tolerance):
+            regressions.append((name, old['median_ms'], new['median_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--links", type=int, default=3, help="family links per user")
+    parser.add_argument("--memories", type=int, default=10_000, help="rows to seed (1k-1M)")
+    parser.add_argument("--attachments", type=float, default=0.0, help="fraction of seeded rows with a file attached")
+    parser.add_argument("--attachment-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database", default="memolink_bench", help="MySQL schema to seed; never the live one")
+    parser.add_argument("--sqlite", metavar="PATH", help="benchmark an SQLite file instead of MySQL")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="previous JSON results; exit 1 if a median regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed median slowdown for --compare")
+    parser.add_argument("--keep", action="store_true", help="leave the seeded rows in place")
+    args = parser.parse_args(argv)
+    if not args.sqlite and args.database == DB_CONFIG["database"]:
+        parser.error(f"--database {args.database} is the live schema; pick a dedicated one for benchmarks")
+
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    blob_dir = tempfile.mkdtemp(prefix="pma-bench-blobs-")
+    # caches off: every call should reach MySQL
+    config = dict(DB_CONFIG, database=args.database)
+    if args.sqlite:
+        backend = SQLiteBackend(args.sqlite)
+    else:
+        backend = None
+        create_schema(config)
+    db = Database(config=config, backend=backend, blobs=BlobStore(blob_dir),
+                  result_cache=None, lookup_cache=None)
+    try:
+        migrate(db)
+        gen = Generator(args.seed, run_id)
+        print(f"⏳ Seeding {args.users} users, {args.memories} memories into {args.sqlite or args.database}", file=sys.stderr)
+        seeded = seed(db, gen, args.users, args.links, args.memories, args.attachments, args.attachment_bytes)
+        print(f"⏳ Seeded in {seeded['seed_seconds']}s, running benchmarks", file=sys.stderr)
+        db.metrics.reset()
+        results = run_benchmarks(db, gen, seeded.pop('user_ids'), args.iterations, args.attachment_bytes)
+        query_stats = db.query_stats()
+    finally:
+        if not args.keep:
+            cleanup(db, run_id)
+        db.close()
+        shutdown()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec="seconds"),
+            'backend': db.backend.name,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': {k: v for k, v in vars(args).items() if k not in ("output", "compare", "keep")},
+            'seed': seeded,
+        },
+        'results': results,
+        # per-method statements, rows and bytes behind the timings above
+        'queries': query_stats,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"✅ Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, old, new in regressions:
+            print(f"❌ {name}: median {old}ms -> {new}ms", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
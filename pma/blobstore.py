@@ -0,0 +1,65 @@
+# ✅ blobstore.py - content-addressed file store for voice notes and attachments
+# blobs live at <root>/<aa>/<bb>/<sha256> so identical uploads are stored once
+import hashlib
+import os
+import tempfile
+import time
+
+BLOB_DIR = os.getenv("PMA_BLOB_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "blobs"))
+
+
+class BlobStore:
+    def __init__(self, root=BLOB_DIR):
+        self.root = root
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            # dedup hit: refresh mtime so a concurrent gc() treats the blob as freshly used
+            os.utime(path)
+            return digest
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return digest
+
+    def get(self, digest):
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def gc(self, referenced, grace_seconds=3600):
+        # remove blobs no row points to any more; recent files are kept so an upload
+        # that is not committed yet is never collected
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for folder, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(folder, name)
+                if name in referenced or os.path.getmtime(path) > cutoff:
+                    continue
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+def sniff_audio_mime(data):
+    if data[:4] == b"RIFF":
+        return "audio/wav"
+    if data[:3] == b"ID3" or data[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    return "audio/wav"
@@ -0,0 +1,171 @@
+# ✅ cache.py - in-process caches shared by every Streamlit session
+# VersionedCache: memory reads keyed by (user_id, version, query); a write bumps the user's
+# version so older entries are never read again and are dropped right away.
+# TTLCache: user and family-link lookups, expired by time or dropped by the writes that change them.
+import functools
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+
+class VersionedCache:
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_user = defaultdict(set)
+        self._versions = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, user_id):
+        with self._lock:
+            return self._versions[user_id]
+
+    def get(self, user_id, version, key):
+        full_key = (user_id, version, key)
+        with self._lock:
+            if full_key in self._entries:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return True, self._entries[full_key]
+            self.misses += 1
+            return False, None
+
+    def put(self, user_id, version, key, value):
+        full_key = (user_id, version, key)
+        with self._lock:
+            if version != self._versions[user_id]:
+                # a write landed while we were querying; the result may already be stale
+                return
+            self._entries[full_key] = value
+            self._entries.move_to_end(full_key)
+            self._by_user[user_id].add(full_key)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                self._forget(old)
+
+    def bump(self, *user_ids):
+        with self._lock:
+            for user_id in set(user_ids):
+                self._versions[user_id] += 1
+                for full_key in self._by_user.pop(user_id, ()):
+                    self._entries.pop(full_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self._versions.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+    def _forget(self, full_key):
+        keys = self._by_user.get(full_key[0])
+        if keys is not None:
+            keys.discard(full_key)
+            if not keys:
+                del self._by_user[full_key[0]]
+
+
+class TTLCache:
+    # small thread-safe TTL + LRU map for lookups that rarely change (users, family links)
+    def __init__(self, ttl=300.0, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # something was invalidated while this value was loaded, it may be stale
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+
+RESULT_CACHE = VersionedCache()
+LOOKUP_CACHE = TTLCache()
+
+
+def lookup_key(method_name, *args):
+    return (method_name,) + args
+
+
+def cached_read(method):
+    # caches a Database read whose first argument is the user id
+    @functools.wraps(method)
+    def wrapper(self, user_id, *args, **kwargs):
+        cache = self.result_cache
+        if cache is None:
+            return method(self, user_id, *args, **kwargs)
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        version = cache.version(user_id)
+        hit, rows = cache.get(user_id, version, key)
+        if not hit:
+            rows = method(self, user_id, *args, **kwargs)
+            cache.put(user_id, version, key, rows)
+        # callers get their own copies so they can't modify what is cached
+        return [dict(r) for r in rows]
+    return wrapper
+
+
+def cached_lookup(method):
+    # caches a Database lookup in self.lookup_cache under lookup_key(name, *args)
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        cache = self.lookup_cache
+        if cache is None:
+            return method(self, *args)
+        key = lookup_key(method.__name__, *args)
+        hit, value = cache.get(key)
+        if not hit:
+            generation = cache.generation()
+            value = method(self, *args)
+            cache.put(key, value, generation)
+        if isinstance(value, list):
+            return [dict(r) for r in value]
+        return dict(value) if value is not None else None
+    return wrapper
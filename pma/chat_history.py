@@ -0,0 +1,104 @@
+# ✅ chat_history.py - keeps the prompt sent to the model inside a token budget
+# Recent turns go verbatim; older turns are folded into a running summary.
+import os
+
+from tracing import TRACER
+
+TOKEN_BUDGET = int(os.getenv("PMA_CHAT_TOKEN_BUDGET", "2000"))
+SUMMARY_TOKENS = 300
+KEEP_RECENT = 4
+MESSAGE_OVERHEAD = 4
+
+SUMMARY_PROMPT = (
+    "Condense this conversation between a user and their personal memory assistant into a short "
+    f"summary (under {SUMMARY_TOKENS * 3 // 4} words). Keep names, dates, decisions and open questions."
+)
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English text, close enough for budgeting without a tokenizer
+    return len(text) // 4 + 1
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+class ChatHistory:
+    def __init__(self, budget=TOKEN_BUDGET, keep_recent=KEEP_RECENT, summarizer=None):
+        self.budget = budget
+        self.keep_recent = keep_recent
+        # summarizer(previous_summary, messages) -> new summary text
+        self.summarizer = summarizer
+        self.messages = []
+        self.summary = ""
+        self.summarized = 0
+
+    def append(self, role, content):
+        self.messages.append({"role": role, "content": content})
+
+    def recent(self):
+        return self.messages[self.summarized:]
+
+    def _summary_message(self):
+        return {"role": "system", "content": "Summary of the earlier conversation: " + self.summary}
+
+    def _size(self):
+        total = sum(message_tokens(m) for m in self.recent())
+        return total + (message_tokens(self._summary_message()) if self.summary else 0)
+
+    def compact(self):
+        # fold the oldest verbatim turns into the summary until we are well under budget,
+        # so summarizing doesn't have to happen again on the very next turn
+        if self._size() <= self.budget:
+            return
+        target = self.budget * 3 // 4
+        fold_until = self.summarized
+        size = self._size()
+        while size > target and len(self.messages) - fold_until > self.keep_recent:
+            size -= message_tokens(self.messages[fold_until])
+            fold_until += 1
+        if fold_until == self.summarized:
+            return
+        folded = self.messages[self.summarized:fold_until]
+        self.summary = self._summarize(folded)
+        self.summarized = fold_until
+
+    def _summarize(self, folded):
+        if self.summarizer is not None:
+            try:
+                return self.summarizer(self.summary, folded)
+            except Exception as e:
+                print("⚠️ Chat summary failed, falling back to truncation:", e)
+        return truncate_summary(self.summary, folded)
+
+    def build(self, system=None):
+        # messages to send for the next completion
+        self.compact()
+        out = [{"role": "system", "content": system}] if system else []
+        if self.summary:
+            out.append(self._summary_message())
+        return out + self.recent()
+
+
+def truncate_summary(summary, folded, max_tokens=SUMMARY_TOKENS):
+    # local fallback: keep the tail of "previous summary + folded turns"
+    text = " ".join([summary] + [f"{m['role']}: {m['content']}" for m in folded]).strip()
+    max_chars = max_tokens * 4
+    return text if len(text) <= max_chars else "…" + text[-max_chars:]
+
+
+def llm_summarizer(get_client, model):
+    # get_client is called per summary so a rebuilt client (see resources.py) is picked up
+    def summarize(summary, folded):
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in folded)
+        if summary:
+            transcript = f"Earlier summary: {summary}\n\n{transcript}"
+        with TRACER.span("llm.summarize", model=model, messages=len(folded)):
+            response = get_client().chat.completions.create(
+                model=model,
+                messages=[{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": transcript}],
+                max_tokens=SUMMARY_TOKENS,
+            )
+        return response.choices[0].message.content.strip()
+    return summarize
@@ -1,159 +1,594 @@
 # ✅ Updated database.py
-import mysql.connector
-from mysql.connector import Error
-import bcrypt
+import base64
+import calendar
+import contextvars
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date as ddate, datetime
 
+from backends import make_backend
+from blobstore import BlobStore, sniff_audio_mime
+from cache import LOOKUP_CACHE, RESULT_CACHE, cached_lookup, cached_read, lookup_key
+from metrics import QUERY_METRICS, instrumented
+from passwords import hash_password
+from pool import ConnectionPool, PoolError
+
+DB_CONFIG = dict(
+    host=os.getenv("PMA_DB_HOST", "localhost"),
+    port=int(os.getenv("PMA_DB_PORT", "3307")),
+    user=os.getenv("PMA_DB_USER", "root"),
+    # never commit a real password here; without PMA_DB_PASSWORD this is a passwordless dev login
+    password=os.getenv("PMA_DB_PASSWORD", ""),
+    database=os.getenv("PMA_DB_NAME", "memory_assistant1"),
+)
+# every Streamlit session shares one Database, so size the pool for the expected concurrent reruns
+POOL_SIZE = int(os.getenv("PMA_DB_POOL_SIZE", "5"))
+POOL_TIMEOUT = float(os.getenv("PMA_DB_POOL_TIMEOUT", "10"))
+
+# never SELECT * from user_data: the legacy inline voice_note/file_data columns can still hold megabytes
+MEMORY_COLUMNS = ("id, user_id, data_type, title, content, date, time, remind_at, file_name, "
+                  "voice_hash, voice_size, voice_mime, file_hash, file_size, file_mime")
+SUMMARY_COLUMNS = "id, title, data_type, date, time, (voice_hash IS NOT NULL OR file_hash IS NOT NULL) AS has_attachment"
+
+# a user sees the memories they own plus the ones family members shared with them
+OWNED_SCOPE = "user_id = %s"
+SHARED_SCOPE = "id IN (SELECT memory_id FROM memory_shares WHERE user_id = %s)"
+# (user_id, content_hash): served by the unique key that also rejects duplicate memories
+DUPLICATE_MEMORY = "SELECT 1 FROM user_data WHERE user_id = %s AND content_hash = %s"
+# (memory_id, owner id): share a new memory with everyone who linked its owner as family
+SHARE_MEMORY = "INSERT INTO memory_shares (memory_id, user_id) SELECT %s, f.user_id FROM family_links f WHERE f.family_id = %s"
+
+# InnoDB ignores fulltext tokens shorter than innodb_ft_min_token_size (3 by default);
+# the SQLite backend uses the same cut-off so both return the same matches
+FT_MIN_TOKEN = 3
+DATE_QUERY = re.compile(r"^\s*(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?\s*$")
+
+
+def _as_date(value):
+    if not value:
+        return None
+    if isinstance(value, str):
+        return ddate.fromisoformat(value.strip()[:10])
+    return value
+
+
+def content_hash(data_type, title, content, date=None, time=None):
+    # identity of a memory for duplicate detection: case and whitespace differences don't count
+    parts = [data_type, title, content, str(_as_date(date) or ""), time or ""]
+    normalized = "\x1f".join(" ".join(str(p).split()).casefold() for p in parts)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def reminder_datetime(day, time):
+    # date + "HH:MM" -> the indexed remind_at value, None when either part is missing
+    day = _as_date(day)
+    if not day or not time:
+        return None
+    try:
+        return datetime.combine(day, datetime.strptime(time, "%H:%M").time())
+    except ValueError:
+        return None
+
+
+def date_range(query):
+    # "2024", "2024-05" or "2024-05-17" -> inclusive (first, last) date, otherwise None
+    m = DATE_QUERY.match(query)
+    if not m:
+        return None
+    try:
+        year = int(m.group(1))
+        if m.group(3):
+            day = ddate(year, int(m.group(2)), int(m.group(3)))
+            return day, day
+        if m.group(2):
+            month = int(m.group(2))
+            return ddate(year, month, 1), ddate(year, month, calendar.monthrange(year, month)[1])
+        return ddate(year, 1, 1), ddate(year, 12, 31)
+    except ValueError:
+        return None
+
+
+def fulltext_words(query):
+    # words long enough to be indexed; the backend turns them into a query where every word
+    # must match and the last one is a prefix, so results keep up while the user is typing
+    return [w for w in re.findall(r"\w+", query) if len(w) >= FT_MIN_TOKEN]
+
+
+# public methods report timing, rows, bytes and pool wait to self.metrics (see metrics.py)
+@instrumented(exclude=("connect", "close", "submit", "gather", "cache_stats", "query_stats"))
 class Database:
-    def __init__(self):
-        self.conn = self.connect()
+    def __init__(self, pool_size=POOL_SIZE, pool_timeout=POOL_TIMEOUT, ping_after=30.0, max_statements=64, blobs=None,
+                 result_cache=RESULT_CACHE, lookup_cache=LOOKUP_CACHE, listeners=(), config=None, backend=None,
+                 metrics=QUERY_METRICS):
+        # MySQL (config defaults to DB_CONFIG) or SQLite, picked with PMA_DB_BACKEND unless passed in
+        self.backend = backend or make_backend(config=config or DB_CONFIG)
+        # driver errors plus pool timeouts, for the methods that report failure instead of raising
+        self.errors = (self.backend.Error, PoolError)
+        # connections are opened lazily and re-used across calls instead of one handshake per method
+        self.pool = ConnectionPool(
+            self.backend,
+            size=pool_size,
+            timeout=pool_timeout,
+            ping_after=ping_after,
+            max_statements=max_statements,
+        )
+        # per-method timings and the slow-query log; None disables instrumentation
+        self.metrics = metrics
+        if metrics is not None:
+            self.pool.on_acquire = metrics.acquired
+        # voice notes and files live on disk, user_data only keeps hash/size/mime
+        self.blobs = blobs or BlobStore()
+        # memory reads are cached per user until that user's data changes; None disables it
+        self.result_cache = result_cache
+        # users and family links are cached process-wide with a TTL
+        self.lookup_cache = lookup_cache
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # objects notified after memory writes commit (memory_added / memory_removed / memories_reset)
+        self.listeners = list(listeners)
 
     def connect(self):
         try:
-            conn = mysql.connector.connect(
-                host="localhost",
-                port=3307,
-                user="root",
-                password="5218kaviya",
-                database="memory_assistant1"
-            )
-            return conn
-        except Error as e:
+            return self.backend.connect()
+        except self.backend.Error as e:
             print("❌ Database connection failed:", e)
             return None
 
-    def get_user(self, username):
-        conn = self.connect()
-        try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-            return cursor.fetchone()
-        finally:
-            conn.close()
-
-    def create_user(self, username, password):
-        conn = self.connect()
+    def ping(self):
         try:
-            cursor = conn.cursor()
-            hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-            cursor.execute("INSERT INTO users (username, password_hash) VALUES (%s, %s)", (username, hashed))
-            conn.commit()
+            with self.pool.connection() as pc:
+                pc.conn.ping(reconnect=False)
             return True
-        except mysql.connector.IntegrityError:
+        except self.errors as e:
+            print("❌ Database connection failed:", e)
             return False
-        finally:
-            conn.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.pool.close()
+
+    # --- concurrent reads: independent queries of a page run on separate pooled connections ---
+    def submit(self, fn, *args, **kwargs):
+        # fn is a Database method; returns a Future (don't call Streamlit from fn, it runs off-thread)
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="db-query")
+        # run in a copy of the caller's context so trace spans nest under the calling page
+        return self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def gather(self, *calls):
+        # db.gather((db.get_linked_to_user, uid), (db.get_family_members, uid)) -> results in call order
+        futures = [self.submit(*call) for call in calls]
+        return [f.result() for f in futures]
+
+    # --- helpers: run a statement on a pooled connection through a cached prepared cursor ---
+    def _fetchall(self, pc, sql, params=(), dictionary=True):
+        cursor = pc.cursor(sql, dictionary=dictionary)
+        if self.metrics is None:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        with self.metrics.statement(sql) as stmt:
+            cursor.execute(sql, params)
+            return stmt.fetched(cursor.fetchall())
+
+    def _fetchone(self, pc, sql, params=(), dictionary=True):
+        # always drain the cursor so the cached statement can be executed again
+        rows = self._fetchall(pc, sql, params, dictionary)
+        return rows[0] if rows else None
+
+    def _execute(self, pc, sql, params=()):
+        cursor = pc.cursor(sql)
+        with self._timed(sql):
+            cursor.execute(sql, params)
+        return cursor
+
+    def _timed(self, sql):
+        # statement timing for cursors used directly (executemany, variable IN lists)
+        return self.metrics.statement(sql) if self.metrics is not None else nullcontext()
+
+    def query_stats(self):
+        return self.metrics.snapshot() if self.metrics is not None else None
+
+    def cache_stats(self):
+        return {
+            "results": self.result_cache.stats() if self.result_cache is not None else None,
+            "lookups": self.lookup_cache.stats() if self.lookup_cache is not None else None,
+        }
+
+    def _forget_lookups(self, *keys):
+        if self.lookup_cache is not None:
+            self.lookup_cache.invalidate(*keys)
+
+    def _notify(self, event, *args):
+        for listener in self.listeners:
+            handler = getattr(listener, event, None)
+            if handler is not None:
+                handler(*args)
+
+    def _invalidate(self, *user_ids):
+        # call after commit, so a read that starts later can't cache the old rows again
+        if self.result_cache is not None:
+            self.result_cache.bump(*user_ids)
+
+    @cached_lookup
+    def get_user(self, username):
+        with self.pool.connection() as pc:
+            return self._fetchone(pc, "SELECT * FROM users WHERE username = %s", (username,))
+
+    def create_user(self, username, password):
+        hashed = hash_password(password)
+        with self.pool.connection() as pc:
+            try:
+                self._execute(pc, "INSERT INTO users (username, password_hash) VALUES (%s, %s)", (username, hashed))
+                pc.conn.commit()
+                # a failed login may have cached "no such user"
+                self._forget_lookups(lookup_key("get_user", username))
+                return True
+            except self.backend.IntegrityError:
+                pc.conn.rollback()
+                return False
+
+    def update_password_hash(self, user_id, username, hashed):
+        with self.pool.connection() as pc:
+            self._execute(pc, "UPDATE users SET password_hash = %s WHERE id = %s", (hashed, user_id))
+            pc.conn.commit()
+        self._forget_lookups(lookup_key("get_user", username))
 
     def link_family_member(self, user_id, fam_username):
-        conn = self.connect()
-        if not conn: return False
         try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id FROM users WHERE username = %s", (fam_username,))
-            fam_id = cursor.fetchone()
-            if not fam_id:
-                return False
-            fam_id = fam_id[0]
-            cursor.execute("SELECT COUNT(*) FROM family_links WHERE user_id = %s AND family_id = %s", (user_id, fam_id))
-            if cursor.fetchone()[0] > 0:
-                return False
-            cursor.execute("INSERT INTO family_links (user_id, family_id) VALUES (%s, %s)", (user_id, fam_id))
-            conn.commit()
+            with self.pool.connection() as pc:
+                fam_id = self._fetchone(pc, "SELECT id FROM users WHERE username = %s", (fam_username,), dictionary=False)
+                if not fam_id:
+                    return False
+                fam_id = fam_id[0]
+                # the unique (user_id, family_id) key makes an existing link a no-op insert
+                cursor = self._execute(pc, "INSERT IGNORE INTO family_links (user_id, family_id) VALUES (%s, %s)", (user_id, fam_id))
+                if not cursor.rowcount:
+                    return False
+                pc.conn.commit()
+            self._invalidate(user_id, fam_id)
+            self._forget_lookups(lookup_key("get_family_members", user_id), lookup_key("get_linked_to_user", fam_id))
             return True
-        finally:
-            conn.close()
+        except self.errors as e:
+            print("❌ Database error:", e)
+            return False
 
+    @cached_lookup
     def get_family_members(self, user_id):
-        conn = self.connect()
-        try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT u.id, u.username FROM users u JOIN family_links f ON u.id = f.family_id WHERE f.user_id = %s", (user_id,))
-            return cursor.fetchall()
-        finally:
-            conn.close()
+        with self.pool.connection() as pc:
+            return self._fetchall(pc, "SELECT u.id, u.username FROM users u JOIN family_links f ON u.id = f.family_id WHERE f.user_id = %s", (user_id,))
 
+    @cached_lookup
     def get_linked_to_user(self, user_id):
-        conn = self.connect()
-        try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT u.id, u.username FROM users u JOIN family_links f ON u.id = f.user_id WHERE f.family_id = %s", (user_id,))
-            return cursor.fetchall()
-        finally:
-            conn.close()
+        with self.pool.connection() as pc:
+            return self._linked_to_user(pc, user_id)
 
-    def add_data(self, user_id, data_type, title, content, date=None, time=None, voice_note=None,file_data=None,file_name=None):
-        conn = self.connect()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO user_data (user_id, data_type, title, content, date, time, voice_note,file_data,file_name)
-                VALUES (%s, %s, %s, %s, %s, %s, %s,%s,%s)
-            """, (user_id, data_type, title, content, date, time, voice_note,file_data,file_name))
-            conn.commit()
-
-            # also share memory with linked family
-            family_members = self.get_linked_to_user(user_id)
-            for fam in family_members:
-                cursor.execute("""
-                    INSERT INTO user_data (user_id, data_type, title, content, date, time, voice_note,file_data,file_name)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s,%s,%s)
-                """, (fam['id'], data_type, title + " (Shared from family)", content, date, time, voice_note,file_data,file_name))
-            conn.commit()
-            return True
-        finally:
-            conn.close()
+    def _linked_to_user(self, pc, user_id):
+        return self._fetchall(pc, "SELECT u.id, u.username FROM users u JOIN family_links f ON u.id = f.user_id WHERE f.family_id = %s", (user_id,))
+
+    def add_data(self, user_id, data_type, title, content, date=None, time=None, voice_note=None,file_data=None,file_name=None, voice_mime=None, file_mime=None):
+        digest = content_hash(data_type, title, content, date, time)
+        if voice_note or file_data:
+            # a duplicate would leave its attachment with no row pointing at it, so look before
+            # writing blobs; one that slips in concurrently is removed later by collect_blobs()
+            with self.pool.connection() as pc:
+                if self._fetchone(pc, DUPLICATE_MEMORY, (user_id, digest), dictionary=False):
+                    return False
+        voice_hash, voice_size, voice_mime = self._store_blob(voice_note, voice_mime, audio=True)
+        file_hash, file_size, file_mime = self._store_blob(file_data, file_mime)
+        # the unique (user_id, content_hash) key turns duplicate detection and the insert into one
+        # statement: rowcount is 1 for a new memory and 0 when it already existed
+        insert = """
+                INSERT INTO user_data (user_id, data_type, title, content, date, time, remind_at, content_hash, file_name,
+                                       voice_hash, voice_size, voice_mime, file_hash, file_size, file_mime)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE id = id
+            """
+        with self.pool.connection() as pc:
+            cursor = self._execute(pc, insert, (user_id, data_type, title, content, date, time, reminder_datetime(date, time),
+                                                digest, file_name, voice_hash, voice_size, voice_mime, file_hash, file_size, file_mime))
+            if not cursor.rowcount:
+                pc.conn.rollback()
+                return False
+            # share the single row with everyone linked to this user instead of copying it
+            memory_id = cursor.lastrowid
+            self._execute(pc, SHARE_MEMORY, (memory_id, user_id))
+            pc.conn.commit()
+            affected = self._memory_audience(pc, memory_id)
+        self._invalidate(user_id, *affected)
+        self._notify("memory_added", affected, {'id': memory_id, 'title': title, 'data_type': data_type,
+                                                'date': date, 'content': content})
+        return True
+
+    def _memory_audience(self, pc, memory_id):
+        # the owner and everyone the memory is shared with
+        rows = self._fetchall(pc, """
+            SELECT user_id FROM user_data WHERE id = %s
+            UNION SELECT user_id FROM memory_shares WHERE memory_id = %s
+        """, (memory_id, memory_id), dictionary=False)
+        return [r[0] for r in rows]
+
+    def add_data_bulk(self, rows, chunk_size=500):
+        # rows: dicts with user_id, data_type, title, content and optional date/time.
+        # One multi-row insert (duplicates skipped by the content_hash key), one share fan-out
+        # and one commit per chunk.
+        inserted = duplicates = 0
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                n = self._insert_chunk(chunk)
+                inserted, duplicates, chunk = inserted + n, duplicates + len(chunk) - n, []
+        if chunk:
+            n = self._insert_chunk(chunk)
+            inserted, duplicates = inserted + n, duplicates + len(chunk) - n
+        return {"inserted": inserted, "duplicates": duplicates}
+
+    def _insert_chunk(self, chunk):
+        new_rows, seen = [], set()
+        for r in chunk:
+            day, time = _as_date(r.get('date')), r.get('time') or None
+            digest = content_hash(r['data_type'], r['title'], r['content'], day, time)
+            if (r['user_id'], digest) not in seen:
+                seen.add((r['user_id'], digest))
+                new_rows.append((r['user_id'], r['data_type'], r['title'], r['content'], day, time,
+                                 reminder_datetime(day, time), digest))
+        inserted = 0
+        with self.pool.connection() as pc:
+            # plain cursor: mysql.connector rewrites executemany() INSERTs into one multi-row statement
+            cursor = pc.conn.cursor()
+            if new_rows:
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM user_data")
+                floor_id = cursor.fetchone()[0]
+                insert = """
+                    INSERT INTO user_data (user_id, data_type, title, content, date, time, remind_at, content_hash)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE id = id
+                """
+                with self._timed(insert):
+                    cursor.executemany(insert, new_rows)
+                inserted = cursor.rowcount
+                users = sorted({r[0] for r in new_rows})
+                share = f"""
+                    INSERT IGNORE INTO memory_shares (memory_id, user_id)
+                    SELECT d.id, f.user_id FROM user_data d JOIN family_links f ON f.family_id = d.user_id
+                    WHERE d.id > %s AND d.user_id IN ({", ".join(["%s"] * len(users))})
+                """
+                with self._timed(share):
+                    cursor.execute(share, [floor_id] + users)
+                cursor.execute(f"SELECT user_id FROM family_links WHERE family_id IN ({', '.join(['%s'] * len(users))})", users)
+                affected = users + [r[0] for r in cursor.fetchall()]
+            pc.conn.commit()
+            cursor.close()
+        if inserted:
+            self._invalidate(*affected)
+            self._notify("memories_reset", affected)
+        return inserted
+
+    def _store_blob(self, data, mime=None, audio=False):
+        if not data:
+            return None, None, None
+        if isinstance(data, str):
+            # older callers still pass base64 text
+            data = base64.b64decode(data)
+        if not mime:
+            mime = sniff_audio_mime(data) if audio else "application/octet-stream"
+        return self.blobs.put(data), len(data), mime
 
-    def get_user_data(self, user_id, data_type=None):
-        conn = self.connect()
+    def read_blob(self, digest):
+        # None when there is no attachment or its file is gone (collected, or lost with the disk)
+        if not digest:
+            return None
         try:
-            cursor = conn.cursor(dictionary=True)
-            if data_type:
-                cursor.execute("SELECT * FROM user_data WHERE user_id = %s AND data_type = %s ORDER BY id DESC", (user_id, data_type))
-            else:
-                cursor.execute("SELECT * FROM user_data WHERE user_id = %s ORDER BY id DESC", (user_id,))
-            return cursor.fetchall()
-        finally:
-            conn.close()
+            return self.blobs.get(digest)
+        except FileNotFoundError:
+            return None
+
+    def collect_blobs(self, grace_seconds=3600):
+        with self.pool.connection() as pc:
+            rows = self._fetchall(pc, """
+                SELECT voice_hash AS h FROM user_data WHERE voice_hash IS NOT NULL
+                UNION SELECT file_hash FROM user_data WHERE file_hash IS NOT NULL
+            """, dictionary=False)
+        return self.blobs.gc({r[0] for r in rows}, grace_seconds)
+
+    @cached_read
+    def get_user_data(self, user_id, data_type=None, before_id=None, limit=None):
+        return self._list_memories(MEMORY_COLUMNS, user_id, data_type, before_id, limit)
+
+    @cached_read
+    def get_memory_summaries(self, user_id, data_type=None, limit=None, with_content=False, before_id=None):
+        # id/title/type/date/time/has_attachment only; attachments are fetched with get_attachment()
+        columns = SUMMARY_COLUMNS + (", content" if with_content else "")
+        return self._list_memories(columns, user_id, data_type, before_id, limit)
+
+    def _list_memories(self, columns, user_id, data_type, before_id, limit):
+        # keyset pagination: pass the last id of the previous page as before_id
+        where, params = "", ()
+        if data_type:
+            where += " AND data_type = %s"
+            params += (data_type,)
+        if before_id:
+            where += " AND id < %s"
+            params += (before_id,)
+        with self.pool.connection() as pc:
+            return self._visible(pc, user_id, f"SELECT {columns}", where, where_params=params, limit=limit)
+
+    def _visible(self, pc, user_id, select, where="", select_params=(), where_params=(), order="id DESC", limit=None, offset=0):
+        sql, params = self._visible_sql(user_id, select, where, select_params, where_params, order, limit, offset)
+        return self._fetchall(pc, sql, params)
+
+    def _visible_sql(self, user_id, select, where="", select_params=(), where_params=(), order="id DESC", limit=None, offset=0):
+        # the query over owned and shared memories; each branch is ordered and limited on its
+        # own index so the union never materializes more than limit + offset rows per side
+        branch = f"{select}, {{shared}} AS shared FROM user_data WHERE {{scope}}{where} ORDER BY {order}"
+        branch_params = select_params + (user_id,) + where_params
+        tail, tail_params = "", ()
+        if limit:
+            branch += " LIMIT %s"
+            branch_params += (int(limit) + int(offset),)
+            tail, tail_params = " LIMIT %s OFFSET %s", (int(limit), int(offset))
+        union_branch = self.backend.union_branch
+        sql = (union_branch(branch.format(shared=0, scope=OWNED_SCOPE)) + " UNION ALL "
+               + union_branch(branch.format(shared=1, scope=SHARED_SCOPE)) + f" ORDER BY {order}{tail}")
+        return sql, branch_params + branch_params + tail_params
+
+    @cached_read
+    def search(self, user_id, query, limit=50, offset=0, before_id=None, before_score=None):
+        # ranked server-side search over title/content (FULLTEXT) or a date / month / year.
+        # Next pages are fetched with the last row's id (and score, for text matches) as cursor.
+        select, select_params = f"SELECT {SUMMARY_COLUMNS}, content", ()
+        order = "id DESC"
+        days = date_range(query)
+        words = fulltext_words(query)
+        ranked = bool(words) and not days
+        if days:
+            where, params = " AND date BETWEEN %s AND %s", (days[0], days[1])
+        elif ranked:
+            terms = self.backend.fulltext_query(words)
+            match, matches = self.backend.fulltext()
+            select += f", {match} AS score"
+            select_params = (terms,)
+            where, params = f" AND {matches}", (terms,)
+            if before_id and before_score is not None:
+                where += f" AND ({match} < %s OR ({match} = %s AND id < %s))"
+                params += (terms, before_score, terms, before_score, before_id)
+            order = "score DESC, id DESC"
+        elif query.strip():
+            # too short for the fulltext index: fall back to a title prefix match
+            where = " AND title LIKE %s" + self.backend.like_escape
+            params = (query.strip().replace("%", r"\%").replace("_", r"\_") + "%",)
+        else:
+            return []
+        if not ranked and before_id:
+            where += " AND id < %s"
+            params += (before_id,)
+        with self.pool.connection() as pc:
+            return self._visible(pc, user_id, select, where, select_params, params, order, limit, offset)
+
+    def get_memory_documents(self, user_id):
+        # every visible memory's text, for building the chat retrieval index
+        with self.pool.connection() as pc:
+            return self._visible(pc, user_id, "SELECT id, title, data_type, date, content")
+
+    def get_attachment(self, memory_id):
+        with self.pool.connection() as pc:
+            row = self._fetchone(pc, "SELECT id, file_name, voice_hash, voice_mime, file_hash, file_mime FROM user_data WHERE id = %s", (memory_id,))
+        if not row:
+            return None
+        row['voice_note'] = self.read_blob(row['voice_hash'])
+        row['file_data'] = self.read_blob(row['file_hash'])
+        return row
+
+    # --- reminders: scheduler.py loads upcoming ones and emits reminder_events the UI polls ---
+    def get_max_memory_id(self):
+        with self.pool.connection() as pc:
+            return self._fetchone(pc, "SELECT COALESCE(MAX(id), 0) FROM user_data", dictionary=False)[0]
+
+    def get_scheduled_reminders(self, start, end, after_id=0, max_id=None):
+        # every user's reminders with start <= remind_at < end, served by idx_user_data_remind_at
+        sql = "SELECT id, user_id, title, data_type, remind_at FROM user_data WHERE remind_at >= %s AND remind_at < %s AND id > %s"
+        params = (start, end, after_id)
+        if max_id is not None:
+            sql += " AND id <= %s"
+            params += (max_id,)
+        with self.pool.connection() as pc:
+            return self._fetchall(pc, sql, params)
+
+    def get_due_reminders(self, user_id, start, end, limit=None):
+        # the user's own and shared reminders with start <= remind_at < end, one range scan per
+        # side on (user_id, remind_at) / the shares primary key
+        with self.pool.connection() as pc:
+            return self._visible(pc, user_id, f"SELECT {SUMMARY_COLUMNS}, remind_at",
+                                 " AND remind_at >= %s AND remind_at < %s", where_params=(start, end),
+                                 order="remind_at, id", limit=limit)
+
+    def emit_reminder_events(self, reminders):
+        # reminders: (memory_id, due_at) pairs. Owner and every user it is shared with get an
+        # event; memories deleted since they were scheduled simply produce no rows, and the
+        # unique key makes re-emitting after a scheduler restart a no-op.
+        with self.pool.connection() as pc:
+            for memory_id, due_at in reminders:
+                self._execute(pc, """
+                    INSERT IGNORE INTO reminder_events (memory_id, user_id, due_at, title, data_type)
+                    SELECT d.id, d.user_id, %s, d.title, d.data_type FROM user_data d WHERE d.id = %s
+                    UNION ALL
+                    SELECT d.id, s.user_id, %s, d.title, d.data_type
+                    FROM memory_shares s JOIN user_data d ON d.id = s.memory_id WHERE s.memory_id = %s
+                """, (due_at, memory_id, due_at, memory_id))
+            pc.conn.commit()
+
+    def get_pending_reminders(self, user_id):
+        with self.pool.connection() as pc:
+            return self._fetchall(pc, """
+                SELECT id, memory_id, title, data_type, due_at FROM reminder_events
+                WHERE user_id = %s AND delivered_at IS NULL ORDER BY due_at
+            """, (user_id,))
+
+    def mark_reminders_delivered(self, user_id, event_ids):
+        if not event_ids:
+            return
+        with self.pool.connection() as pc:
+            cursor = pc.conn.cursor()
+            sql = f"UPDATE reminder_events SET delivered_at = %s WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(event_ids))})"
+            with self._timed(sql):
+                cursor.execute(sql, [datetime.now(), user_id] + list(event_ids))
+            pc.conn.commit()
+            cursor.close()
 
     def memory_exists(self, user_id, data_type, title, content, date, time):
-        conn = self.connect()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT COUNT(*) FROM user_data 
-                WHERE user_id = %s AND data_type = %s AND title = %s AND content = %s 
-                AND date = %s AND time = %s
-            """, (user_id, data_type, title, content, date, time))
-            return cursor.fetchone()[0] > 0
-        finally:
-            conn.close()
+        with self.pool.connection() as pc:
+            row = self._fetchone(pc, "SELECT COUNT(*) FROM user_data WHERE user_id = %s AND content_hash = %s",
+                                 (user_id, content_hash(data_type, title, content, date, time)), dictionary=False)
+            return row[0] > 0
 
     def delete_all_user_data(self, user_id):
-        conn = self.connect()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM user_data WHERE user_id = %s", (user_id,))
-            conn.commit()
-            return True
-        finally:
-            conn.close()
+        with self.pool.connection() as pc:
+            audience = self._fetchall(pc, """
+                SELECT DISTINCT s.user_id FROM memory_shares s JOIN user_data d ON d.id = s.memory_id WHERE d.user_id = %s
+            """, (user_id,), dictionary=False)
+            # drop what was shared with this user, then the user's own memories and their shares
+            self._execute(pc, "DELETE FROM memory_shares WHERE user_id = %s", (user_id,))
+            self._execute(pc, "DELETE FROM memory_shares WHERE memory_id IN (SELECT id FROM user_data WHERE user_id = %s)", (user_id,))
+            self._execute(pc, "DELETE FROM user_data WHERE user_id = %s", (user_id,))
+            pc.conn.commit()
+        affected = [user_id] + [r[0] for r in audience]
+        self._invalidate(*affected)
+        self._notify("memories_reset", affected)
+        return True
 
-    def delete_memory(self, memory_id):
-        conn = self.connect()
+    def delete_memory(self, memory_id, user_id=None):
+        # the owner deletes the memory for everyone, a family member only removes their share
         try:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM user_data WHERE id = %s", (memory_id,))
-            conn.commit()
+            with self.pool.connection() as pc:
+                if user_id is not None:
+                    cursor = self._execute(pc, "DELETE FROM memory_shares WHERE memory_id = %s AND user_id = %s", (memory_id, user_id))
+                    if cursor.rowcount:
+                        pc.conn.commit()
+                        self._invalidate(user_id)
+                        self._notify("memory_removed", [user_id], memory_id)
+                        return True
+                audience = self._memory_audience(pc, memory_id)
+                if user_id is not None:
+                    cursor = self._execute(pc, "DELETE FROM user_data WHERE id = %s AND user_id = %s", (memory_id, user_id))
+                else:
+                    cursor = self._execute(pc, "DELETE FROM user_data WHERE id = %s", (memory_id,))
+                if cursor.rowcount:
+                    self._execute(pc, "DELETE FROM memory_shares WHERE memory_id = %s", (memory_id,))
+                pc.conn.commit()
+            if cursor.rowcount <= 0:
+                # not found, or not this user's to delete
+                return False
+            self._invalidate(*audience)
+            self._notify("memory_removed", audience, memory_id)
             return True
-        except:
+        except self.errors:
             return False
-        finally:
-            conn.close()
 
     def get_all_memories_for_user(self, user_id):
-        conn = self.connect()
-        try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM user_data WHERE user_id = %s ORDER BY id DESC", (user_id,))
-            return cursor.fetchall()
-        finally:
-            conn.close()
+        return self.get_user_data(user_id)
@@ -0,0 +1,81 @@
+# ✅ importer.py - stream memories out of CSV / JSON exports into Database.add_data_bulk
+import codecs
+import csv
+import io
+import json
+from datetime import date, datetime
+
+MEMORY_TYPES = ['othernote', 'document', 'asset', 'insurance', 'medication', 'address', 'key_date']
+
+
+def iter_csv(fileobj):
+    # rows are decoded and parsed as the file is read, never loaded whole
+    yield from csv.DictReader(io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline=""))
+
+
+def iter_json(fileobj, chunk_size=64 * 1024):
+    # accepts a JSON array of objects or JSON Lines and yields one object at a time
+    decoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder("utf-8-sig")()
+    buf, eof = "", False
+    while True:
+        buf = buf.lstrip().lstrip("[,").lstrip()
+        if buf.startswith("]"):
+            return
+        if buf:
+            try:
+                obj, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield obj
+                buf = buf[end:]
+                continue
+        elif eof:
+            return
+        chunk = fileobj.read(chunk_size)
+        eof = not chunk
+        buf += reader.decode(chunk, final=eof)
+
+
+def to_rows(records, user_id, default_type="othernote"):
+    # maps exported records onto user_data rows; returns (rows generator, skipped counter)
+    skipped = [0]
+
+    def rows():
+        for rec in records:
+            if not isinstance(rec, dict):
+                skipped[0] += 1
+                continue
+            title = str(rec.get('title') or "").strip()
+            content = str(rec.get('content') or rec.get('body') or rec.get('text') or "").strip()
+            if not title or not content:
+                skipped[0] += 1
+                continue
+            data_type = str(rec.get('data_type') or rec.get('type') or default_type).strip().lower()
+            try:
+                day = date.fromisoformat(str(rec['date']).strip()[:10]) if rec.get('date') else None
+                # the dashboard parses reminder times as %H:%M
+                time = datetime.strptime(str(rec['time']).strip()[:5], "%H:%M").strftime("%H:%M") if rec.get('time') else None
+            except ValueError:
+                skipped[0] += 1
+                continue
+            yield {
+                'user_id': user_id,
+                'data_type': data_type if data_type in MEMORY_TYPES else default_type,
+                'title': title,
+                'content': content,
+                'date': day,
+                'time': time,
+            }
+
+    return rows(), skipped
+
+
+def import_memories(db, user_id, fileobj, fmt, chunk_size=500):
+    records = iter_csv(fileobj) if fmt == "csv" else iter_json(fileobj)
+    rows, skipped = to_rows(records, user_id)
+    result = db.add_data_bulk(rows, chunk_size=chunk_size)
+    result['skipped'] = skipped[0]
+    return result
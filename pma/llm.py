@@ -0,0 +1,46 @@
+# ✅ llm.py - chat completion helpers shared by the app
+import os
+import time
+
+import openai
+
+LLM_BASE_URL = os.getenv("PMA_LLM_BASE_URL", "https://api.poe.com/v1")
+LLM_API_KEY = os.getenv("PMA_LLM_API_KEY")
+CHAT_TIMEOUT = float(os.getenv("PMA_CHAT_TIMEOUT", "60"))
+
+
+class LLMNotConfigured(RuntimeError):
+    pass
+
+
+def make_client():
+    if not LLM_API_KEY:
+        raise LLMNotConfigured(f"PMA_LLM_API_KEY is not set; export the API key for {LLM_BASE_URL} to enable the chat")
+    return openai.OpenAI(api_key=LLM_API_KEY, base_url=LLM_BASE_URL)
+
+
+class ReplyTimeout(Exception):
+    pass
+
+
+def stream_completion(client, model, messages, timeout=CHAT_TIMEOUT):
+    # yields text deltas as they arrive; the whole reply must finish within `timeout` seconds.
+    # Closing the generator (e.g. when Streamlit stops the script for a rerun) closes the
+    # HTTP stream, so a cancelled reply stops costing tokens.
+    # A stream that goes quiet for `timeout` seconds surfaces as a read timeout; same outcome.
+    deadline = time.monotonic() + timeout
+    message = f"No complete reply within {timeout:.0f}s"
+    try:
+        stream = client.chat.completions.create(model=model, messages=messages, stream=True, timeout=timeout)
+    except openai.APITimeoutError:
+        raise ReplyTimeout(message) from None
+    try:
+        for chunk in stream:
+            if time.monotonic() > deadline:
+                raise ReplyTimeout(message)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except openai.APITimeoutError:
+        raise ReplyTimeout(message) from None
+    finally:
+        stream.close()
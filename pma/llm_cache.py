@@ -0,0 +1,115 @@
+# ✅ llm_cache.py - on-disk cache of assistant replies
+# Keyed by user + model + normalized messages + a hash of the memory context sent along; entries expire
+# after a TTL, the file is kept under a size budget by evicting least recently used replies, and
+# a user's entries are dropped whenever their memories change (register as a Database listener).
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+LLM_CACHE_PATH = os.getenv("PMA_LLM_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("PMA_LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("PMA_LLM_CACHE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+
+def normalize_messages(messages):
+    return [{"role": m["role"], "content": " ".join(m["content"].split()).casefold()} for m in messages]
+
+
+def context_hash(memories):
+    # identity of the retrieved memories: changes when any of them is edited, added or removed
+    h = hashlib.sha256()
+    for m in sorted(memories, key=lambda m: m['id']):
+        h.update(f"{m['id']}\x1f{m['title']}\x1f{m['content']}\x1e".encode())
+    return h.hexdigest()
+
+
+def cache_key(model, messages, user_id, memory_hash=""):
+    # user_id is part of the key: a reply is never served to another user, even for the same prompt
+    payload = json.dumps([model, normalize_messages(messages), user_id, memory_hash], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ReplyCache:
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS replies (
+                key TEXT PRIMARY KEY,
+                user_id INTEGER,
+                reply TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_replies_user ON replies (user_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_replies_last_used ON replies (last_used)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT reply, created FROM replies WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                self._conn.execute("UPDATE replies SET last_used = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return row[0]
+            if row:
+                self._conn.execute("DELETE FROM replies WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def put(self, key, user_id, reply):
+        now = time.time()
+        size = len(reply.encode())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO replies (key, user_id, reply, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, user_id, reply, size, now, now))
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM replies WHERE created < ?", (now - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM replies").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # drop least recently used replies until we are back under budget
+        freed, doomed = 0, []
+        for key, size in self._conn.execute("SELECT key, size FROM replies ORDER BY last_used"):
+            doomed.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM replies WHERE key = ?", doomed)
+
+    def invalidate_user(self, *user_ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM replies WHERE user_id = ?", [(u,) for u in user_ids])
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM replies").fetchone()
+            total = self.hits + self.misses
+            return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+    # --- Database listener hooks ---
+    def memory_added(self, user_ids, memory):
+        self.invalidate_user(*user_ids)
+
+    def memory_removed(self, user_ids, memory_id):
+        self.invalidate_user(*user_ids)
+
+    def memories_reset(self, user_ids):
+        self.invalidate_user(*user_ids)
+
+
+REPLY_CACHE = ReplyCache()
@@ -0,0 +1,141 @@
+# ✅ memory_index.py - small per-user vector index over memory titles/content for chat retrieval
+# Feature-hashed unigram+bigram vectors in NumPy arrays, kept current through Database listeners.
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+DIM = 1024
+MAX_USERS = 32
+SNIPPET_CHARS = 300
+TOKEN_RE = re.compile(r"\w+")
+
+
+def memory_text(m):
+    return " ".join(str(m[k]) for k in ('title', 'data_type', 'date', 'content') if m.get(k))
+
+
+def embed(text):
+    # signed feature hashing with sublinear tf, L2-normalized, so a dot product is cosine similarity
+    words = TOKEN_RE.findall(text.lower())
+    vec = np.zeros(DIM, dtype=np.float32)
+    for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+        h = zlib.crc32(feature.encode())
+        vec[h % DIM] += 1.0 if h & 0x80000000 else -1.0
+    vec = np.sign(vec) * np.log1p(np.abs(vec))
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class UserIndex:
+    def __init__(self, memories=()):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, DIM), dtype=np.float32)
+        self.size = 0
+        self.docs = {}
+        self.lock = threading.Lock()
+        for m in memories:
+            self.add(m)
+
+    def add(self, memory):
+        with self.lock:
+            if memory['id'] in self.docs:
+                return
+            if self.size == len(self.ids):
+                # grow geometrically so incremental adds stay amortized O(1)
+                capacity = max(16, 2 * self.size)
+                self.ids = np.resize(self.ids, capacity)
+                vectors = np.zeros((capacity, DIM), dtype=np.float32)
+                vectors[:self.size] = self.vectors[:self.size]
+                self.vectors = vectors
+            self.ids[self.size] = memory['id']
+            self.vectors[self.size] = embed(memory_text(memory))
+            self.size += 1
+            self.docs[memory['id']] = {
+                'id': memory['id'],
+                'title': memory['title'],
+                'data_type': memory.get('data_type'),
+                'date': memory.get('date'),
+                'content': (memory.get('content') or "")[:SNIPPET_CHARS],
+            }
+
+    def remove(self, memory_id):
+        with self.lock:
+            if self.docs.pop(memory_id, None) is None:
+                return
+            # swap the last row into the hole
+            i = int(np.nonzero(self.ids[:self.size] == memory_id)[0][0])
+            last = self.size - 1
+            self.ids[i] = self.ids[last]
+            self.vectors[i] = self.vectors[last]
+            self.size = last
+
+    def query(self, text, k=5, min_score=0.1):
+        q = embed(text)
+        with self.lock:
+            if not self.size or not q.any():
+                return []
+            scores = self.vectors[:self.size] @ q
+            top = np.argsort(-scores)[:k] if self.size > k else np.argsort(-scores)
+            return [dict(self.docs[int(self.ids[i])], score=float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+class MemoryIndex:
+    # process-wide registry of per-user indexes; pass it in Database(listeners=[...]) to stay in sync
+    def __init__(self, max_users=MAX_USERS):
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, user_id, db=None):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                self._users.move_to_end(user_id)
+                return index
+        if db is None:
+            return None
+        cache = db.result_cache
+        version = cache.version(user_id) if cache is not None else None
+        index = UserIndex(db.get_memory_documents(user_id))
+        if cache is not None and cache.version(user_id) != version:
+            # a write raced with the build and its event found no index to update; use this
+            # snapshot once and build again next time
+            return index
+        with self._lock:
+            self._users[user_id] = index
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return index
+
+    def search(self, db, user_id, text, k=5, min_score=0.1):
+        return self._get(user_id, db).query(text, k, min_score)
+
+    # --- Database listener hooks ---
+    def memory_added(self, user_ids, memory):
+        for user_id in user_ids:
+            index = self._get(user_id)
+            if index is not None:
+                index.add(memory)
+
+    def memory_removed(self, user_ids, memory_id):
+        for user_id in user_ids:
+            index = self._get(user_id)
+            if index is not None:
+                index.remove(memory_id)
+
+    def memories_reset(self, user_ids):
+        # bulk changes: rebuild lazily on the next search
+        with self._lock:
+            for user_id in user_ids:
+                self._users.pop(user_id, None)
+
+
+MEMORY_INDEX = MemoryIndex()
+
+
+def format_context(memories):
+    lines = [f"- {m['title']} ({m['data_type']}, {m['date'] or 'no date'}): {m['content']}" for m in memories]
+    return "Relevant notes from the user's saved memories:\n" + "\n".join(lines)
@@ -0,0 +1,318 @@
+# ✅ metrics.py - per-call and per-statement instrumentation for Database
+# Every public Database method is timed with the rows and bytes it fetched and how long it
+# waited for a pooled connection. Calls aggregate into histograms that can be read as JSON or
+# Prometheus text, and statements slower than PMA_SLOW_QUERY_MS go to a slow-query log.
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tracing import TRACER
+
+SLOW_QUERY_MS = float(os.getenv("PMA_SLOW_QUERY_MS", "250"))
+SLOW_QUERY_LOG = os.getenv("PMA_SLOW_QUERY_LOG")
+METRICS_PORT = int(os.getenv("PMA_METRICS_PORT", "0"))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 1000, 10_000, 100_000)
+BYTE_BUCKETS = (0, 1024, 16 * 1024, 128 * 1024, 1024 * 1024, 16 * 1024 * 1024)
+
+
+def row_bytes(row):
+    # rough wire size of a fetched row: text/blob lengths, 8 bytes for anything else
+    values = row.values() if isinstance(row, dict) else row
+    return sum(len(v) if isinstance(v, (str, bytes, bytearray)) else 0 if v is None else 8 for v in values)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self):
+        total, out = 0, []
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            total += n
+            out.append((bound, total))
+        return out
+
+
+class MethodStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.statements = 0
+        self.seconds = Histogram(LATENCY_BUCKETS)
+        self.acquire_wait = Histogram(LATENCY_BUCKETS)
+        self.rows = Histogram(ROW_BUCKETS)
+        self.bytes = Histogram(BYTE_BUCKETS)
+
+
+class Frame:
+    # one Database method call in progress on this thread
+    __slots__ = ("method", "statements", "rows", "bytes", "wait")
+
+    def __init__(self, method):
+        self.method = method
+        self.statements = self.rows = self.bytes = 0
+        self.wait = 0.0
+
+
+class Statement:
+    __slots__ = ("rows", "bytes")
+
+    def __init__(self):
+        self.rows = self.bytes = 0
+
+    def fetched(self, rows):
+        self.rows = len(rows)
+        self.bytes = sum(row_bytes(r) for r in rows)
+        return rows
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, path=SLOW_QUERY_LOG, keep=100):
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        self.recent = deque(maxlen=keep)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def record(self, method, sql, seconds, rows):
+        # only the parameterized SQL is kept, never the values bound to it
+        entry = {
+            "at": datetime.now().isoformat(timespec="milliseconds"),
+            "method": method,
+            "ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "sql": " ".join(sql.split()),
+        }
+        with self._lock:
+            self.count += 1
+            self.recent.append(entry)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            else:
+                print(f"🐢 Slow query in {method} ({entry['ms']}ms, {rows} rows): {entry['sql']}")
+
+
+class QueryMetrics:
+    def __init__(self, slow_log=None):
+        self.slow_log = slow_log or SlowQueryLog()
+        self.methods = {}
+        self.collectors = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def register(self, name, collector):
+        # other process-wide stats served next to the Database ones; a collector has
+        # stats() -> dict for snapshot() and prometheus() -> text lines
+        self.collectors[name] = collector
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def call(self, method):
+        stack = self._stack()
+        frame = Frame(method)
+        stack.append(frame)
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield frame
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                # nested calls (get_all_memories_for_user -> get_user_data) count toward the caller too
+                parent = stack[-1]
+                parent.statements += frame.statements
+                parent.rows += frame.rows
+                parent.bytes += frame.bytes
+                parent.wait += frame.wait
+            self._record(frame, elapsed, failed)
+
+    def _record(self, frame, elapsed, failed):
+        with self._lock:
+            stats = self.methods.get(frame.method)
+            if stats is None:
+                stats = self.methods[frame.method] = MethodStats()
+            stats.calls += 1
+            stats.errors += failed
+            stats.statements += frame.statements
+            stats.seconds.observe(elapsed)
+            stats.acquire_wait.observe(frame.wait)
+            stats.rows.observe(frame.rows)
+            stats.bytes.observe(frame.bytes)
+
+    @contextmanager
+    def statement(self, sql):
+        stmt = Statement()
+        start = time.perf_counter()
+        try:
+            yield stmt
+        finally:
+            elapsed = time.perf_counter() - start
+            stack = self._stack()
+            frame = stack[-1] if stack else None
+            if frame is not None:
+                frame.statements += 1
+                frame.rows += stmt.rows
+                frame.bytes += stmt.bytes
+            if elapsed >= self.slow_log.threshold:
+                self.slow_log.record(frame.method if frame else None, sql, elapsed, stmt.rows)
+
+    def acquired(self, wait):
+        # ConnectionPool hook: seconds spent waiting for a connection
+        stack = self._stack()
+        if stack:
+            stack[-1].wait += wait
+
+    def reset(self):
+        with self._lock:
+            self.methods = {}
+
+    def snapshot(self):
+        with self._lock:
+            methods = {}
+            for name, s in sorted(self.methods.items()):
+                methods[name] = {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "statements": s.statements,
+                    "avg_ms": round(s.seconds.sum / s.calls * 1000, 3) if s.calls else 0.0,
+                    "p50_ms_le": s.seconds.quantile(0.5) * 1000,
+                    "p95_ms_le": s.seconds.quantile(0.95) * 1000,
+                    "p99_ms_le": s.seconds.quantile(0.99) * 1000,
+                    "avg_acquire_wait_ms": round(s.acquire_wait.sum / s.calls * 1000, 3) if s.calls else 0.0,
+                    "rows": int(s.rows.sum),
+                    "bytes": int(s.bytes.sum),
+                }
+            snapshot = {"methods": methods, "slow_queries": self.slow_log.count,
+                        "slow_query_ms": self.slow_log.threshold * 1000}
+        for name, collector in self.collectors.items():
+            snapshot[name] = collector.stats()
+        return snapshot
+
+    def prometheus(self):
+        lines = []
+        with self._lock:
+            families = [
+                ("pma_db_call_seconds", "Database method latency", lambda s: s.seconds),
+                ("pma_db_acquire_wait_seconds", "Time spent waiting for a pooled connection", lambda s: s.acquire_wait),
+                ("pma_db_rows", "Rows fetched per Database call", lambda s: s.rows),
+                ("pma_db_bytes", "Approximate bytes fetched per Database call", lambda s: s.bytes),
+            ]
+            for metric, help_text, pick in families:
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for name, s in sorted(self.methods.items()):
+                    h = pick(s)
+                    for bound, total in h.cumulative():
+                        le = "+Inf" if bound == float("inf") else repr(float(bound))
+                        lines.append(f'{metric}_bucket{{method="{name}",le="{le}"}} {total}')
+                    lines.append(f'{metric}_sum{{method="{name}"}} {h.sum}')
+                    lines.append(f'{metric}_count{{method="{name}"}} {h.count}')
+            for metric, help_text, attr in [("pma_db_calls_total", "Database method calls", "calls"),
+                                            ("pma_db_errors_total", "Database method calls that raised", "errors"),
+                                            ("pma_db_statements_total", "SQL statements executed", "statements")]:
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                lines += [f'{metric}{{method="{name}"}} {getattr(s, attr)}' for name, s in sorted(self.methods.items())]
+        lines += ["# HELP pma_db_slow_queries_total Statements slower than the slow-query threshold",
+                  "# TYPE pma_db_slow_queries_total counter", f"pma_db_slow_queries_total {self.slow_log.count}"]
+        for collector in self.collectors.values():
+            lines += collector.prometheus()
+        return "\n".join(lines) + "\n"
+
+
+QUERY_METRICS = QueryMetrics()
+
+
+def instrumented(exclude=()):
+    # class decorator: wraps every public method in QueryMetrics.call(), using self.metrics
+    # (None turns instrumentation off for that instance), and in a "db.<method>" trace span
+    def wrap(name, fn):
+        span_name = "db." + name
+
+        @functools.wraps(fn)
+        def method(self, *args, **kwargs):
+            metrics = self.metrics
+            with TRACER.span(span_name) as span:
+                if metrics is None:
+                    return fn(self, *args, **kwargs)
+                with metrics.call(name) as frame:
+                    result = fn(self, *args, **kwargs)
+                    if span is not None:
+                        span.set(statements=frame.statements, rows=frame.rows, bytes=frame.bytes,
+                                 acquire_wait_ms=round(frame.wait * 1000, 3))
+                    return result
+        return method
+
+    def decorate(cls):
+        for name, fn in list(vars(cls).items()):
+            if callable(fn) and not name.startswith("_") and name not in exclude:
+                setattr(cls, name, wrap(name, fn))
+        return cls
+    return decorate
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    metrics = QUERY_METRICS
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, ctype = json.dumps(self.metrics.snapshot()).encode(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, ctype = self.metrics.prometheus().encode(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port=METRICS_PORT, metrics=QUERY_METRICS):
+    # /metrics (Prometheus text) and /metrics.json on a background thread; returns the server
+    handler = type("Handler", (MetricsHandler,), {"metrics": metrics})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,509 @@
+# ✅ migrations.py - versioned schema/data migrations, run with `python migrations.py`
+# MySQL databases evolve through MIGRATIONS; SQLite files (PMA_DB_BACKEND=sqlite) start from
+# the current schema in SQLITE_MIGRATIONS, since the MySQL history doesn't apply to them.
+# `python migrations.py --check` also EXPLAINs the hot queries and fails if one doesn't use an index;
+# `--gc` deletes attachment files left behind by deleted memories (scheduler.py does this hourly too).
+import argparse
+import base64
+import mimetypes
+import re
+import sys
+
+from blobstore import sniff_audio_mime
+from database import SHARE_MEMORY, SUMMARY_COLUMNS, Database, content_hash
+
+
+def _m000_base_schema(db, pc):
+    # the tables the app started with; existing databases already have them, so this only
+    # does something on a fresh database (later migrations add the rest)
+    cursor = pc.conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(255) NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            UNIQUE KEY uq_users_username (username)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS family_links (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            family_id INT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (family_id) REFERENCES users(id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_data (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            data_type VARCHAR(50) NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            content TEXT,
+            date DATE NULL,
+            time VARCHAR(10) NULL,
+            voice_note LONGTEXT NULL,
+            file_data LONGTEXT NULL,
+            file_name VARCHAR(255) NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+    cursor.close()
+
+
+def _m001_blob_columns(db, pc):
+    cursor = pc.conn.cursor()
+    cursor.execute("""
+        ALTER TABLE user_data
+            ADD COLUMN voice_hash CHAR(64) NULL,
+            ADD COLUMN voice_size INT NULL,
+            ADD COLUMN voice_mime VARCHAR(100) NULL,
+            ADD COLUMN file_hash CHAR(64) NULL,
+            ADD COLUMN file_size INT NULL,
+            ADD COLUMN file_mime VARCHAR(100) NULL
+    """)
+    cursor.close()
+
+
+def _m002_move_blobs_out(db, pc, batch_size=100):
+    # moves base64 voice_note/file_data out of user_data into the blob store, one batch per
+    # commit; rows are cleared as they go so an interrupted run can simply be restarted
+    cursor = pc.conn.cursor(dictionary=True)
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT id, voice_note, file_data, file_name FROM user_data
+            WHERE id > %s AND (voice_note IS NOT NULL OR file_data IS NOT NULL)
+            ORDER BY id LIMIT %s
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for r in rows:
+            voice = _store_b64(db, r['voice_note'])
+            file = _store_b64(db, r['file_data'])
+            cursor.execute("""
+                UPDATE user_data SET
+                    voice_hash = %s, voice_size = %s, voice_mime = %s,
+                    file_hash = %s, file_size = %s, file_mime = %s,
+                    voice_note = NULL, file_data = NULL
+                WHERE id = %s
+            """, (
+                voice[0], voice[1], sniff_audio_mime(voice[2]) if voice[2] else None,
+                file[0], file[1], _guess_mime(r['file_name']) if file[0] else None,
+                r['id'],
+            ))
+        pc.conn.commit()
+        last_id = rows[-1]['id']
+    cursor.close()
+
+
+def _m003_fulltext_index(db, pc):
+    cursor = pc.conn.cursor()
+    cursor.execute("ALTER TABLE user_data ADD FULLTEXT INDEX ft_user_data_title_content (title, content)")
+    cursor.close()
+
+
+SHARED_SUFFIX = " (Shared from family)"
+
+
+def _m004_memory_shares(db, pc, batch_size=500):
+    cursor = pc.conn.cursor(dictionary=True)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS memory_shares (
+            memory_id INT NOT NULL,
+            user_id INT NOT NULL,
+            PRIMARY KEY (memory_id, user_id),
+            KEY idx_memory_shares_user (user_id, memory_id),
+            FOREIGN KEY (memory_id) REFERENCES user_data(id) ON DELETE CASCADE
+        )
+    """)
+    # turn the old "(Shared from family)" copies back into shares of the original row
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT c.id AS copy_id, c.user_id, MIN(o.id) AS memory_id
+            FROM user_data c
+            JOIN family_links f ON f.user_id = c.user_id
+            JOIN user_data o ON o.user_id = f.family_id AND o.data_type = c.data_type
+                AND o.title = LEFT(c.title, CHAR_LENGTH(c.title) - %s) AND o.content = c.content
+                AND o.date <=> c.date AND o.time <=> c.time
+            WHERE c.id > %s AND c.title LIKE %s
+            GROUP BY c.id, c.user_id
+            ORDER BY c.id LIMIT %s
+        """, (len(SHARED_SUFFIX), last_id, "%" + SHARED_SUFFIX, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany("INSERT IGNORE INTO memory_shares (memory_id, user_id) VALUES (%s, %s)",
+                           [(r['memory_id'], r['user_id']) for r in rows])
+        cursor.executemany("DELETE FROM user_data WHERE id = %s", [(r['copy_id'],) for r in rows])
+        pc.conn.commit()
+        last_id = rows[-1]['copy_id']
+    cursor.close()
+
+
+def _m005_reminder_events(db, pc):
+    cursor = pc.conn.cursor()
+    cursor.execute("ALTER TABLE user_data ADD INDEX idx_user_data_date (date)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_events (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            memory_id INT NOT NULL,
+            user_id INT NOT NULL,
+            due_at DATETIME NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            data_type VARCHAR(50) NOT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            delivered_at DATETIME NULL,
+            UNIQUE KEY uq_reminder_events (memory_id, user_id, due_at),
+            KEY idx_reminder_events_pending (user_id, delivered_at, due_at)
+        )
+    """)
+    cursor.close()
+
+
+def _m006_remind_at(db, pc):
+    cursor = pc.conn.cursor()
+    cursor.execute("""
+        ALTER TABLE user_data
+            ADD COLUMN remind_at DATETIME NULL,
+            ADD INDEX idx_user_data_user_remind_at (user_id, remind_at),
+            ADD INDEX idx_user_data_remind_at (remind_at)
+    """)
+    cursor.execute("""
+        UPDATE user_data SET remind_at = TIMESTAMP(date, time)
+        WHERE date IS NOT NULL AND time REGEXP '^[0-9]{1,2}:[0-9]{2}$'
+    """)
+    cursor.close()
+
+
+def _m007_content_hash(db, pc, batch_size=1000):
+    cursor = pc.conn.cursor(dictionary=True)
+    cursor.execute("ALTER TABLE user_data ADD COLUMN content_hash CHAR(64) NULL")
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT id, data_type, title, content, date, time FROM user_data
+            WHERE id > %s ORDER BY id LIMIT %s
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany("UPDATE user_data SET content_hash = %s WHERE id = %s", [
+            (content_hash(r['data_type'], r['title'], r['content'], r['date'], r['time']), r['id']) for r in rows
+        ])
+        pc.conn.commit()
+        last_id = rows[-1]['id']
+    # existing duplicates keep their oldest row hashed; the others get NULL so the unique key fits
+    cursor.execute("""
+        UPDATE user_data d
+        JOIN (SELECT user_id, content_hash, MIN(id) AS keep_id FROM user_data
+              WHERE content_hash IS NOT NULL GROUP BY user_id, content_hash HAVING COUNT(*) > 1) k
+          ON k.user_id = d.user_id AND k.content_hash = d.content_hash
+        SET d.content_hash = NULL
+        WHERE d.id <> k.keep_id
+    """)
+    pc.conn.commit()
+    cursor.execute("ALTER TABLE user_data ADD UNIQUE INDEX uq_user_data_content_hash (user_id, content_hash)")
+    cursor.close()
+
+
+def _index_exists(pc, table, columns, unique=False):
+    # an index starting with these columns (exactly these, for unique ones) is already there
+    cursor = pc.conn.cursor()
+    cursor.execute("""
+        SELECT index_name, MIN(non_unique), GROUP_CONCAT(column_name ORDER BY seq_in_index)
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        GROUP BY index_name
+    """, (table,))
+    rows = cursor.fetchall()
+    cursor.close()
+    for _, non_unique, indexed in rows:
+        indexed = indexed.split(",")
+        if unique and not non_unique and indexed == list(columns):
+            return True
+        if not unique and indexed[:len(columns)] == list(columns):
+            return True
+    return False
+
+
+def _m008_hot_path_indexes(db, pc):
+    # indexes behind the per-user listing, type filter, family lookups and login
+    cursor = pc.conn.cursor()
+    if not _index_exists(pc, "users", ["username"], unique=True):
+        # fails loudly if duplicate usernames exist; those need merging by hand
+        cursor.execute("ALTER TABLE users ADD UNIQUE INDEX uq_users_username (username)")
+    if not _index_exists(pc, "family_links", ["user_id", "family_id"], unique=True):
+        # links were check-then-insert, so a race could have stored one twice; keep the oldest
+        cursor.execute("""
+            DELETE f FROM family_links f
+            JOIN family_links k ON k.user_id = f.user_id AND k.family_id = f.family_id AND k.id < f.id
+        """)
+        pc.conn.commit()
+        cursor.execute("ALTER TABLE family_links ADD UNIQUE INDEX uq_family_links (user_id, family_id)")
+    if not _index_exists(pc, "family_links", ["family_id", "user_id"]):
+        cursor.execute("ALTER TABLE family_links ADD INDEX idx_family_links_family (family_id, user_id)")
+    wanted = [("idx_user_data_user_id", ["user_id", "id"]), ("idx_user_data_user_type_id", ["user_id", "data_type", "id"])]
+    adds = [f"ADD INDEX {name} ({', '.join(cols)})" for name, cols in wanted if not _index_exists(pc, "user_data", cols)]
+    if adds:
+        cursor.execute(f"ALTER TABLE user_data {', '.join(adds)}")
+    cursor.close()
+
+
+def _store_b64(db, value):
+    if not value:
+        return None, None, None
+    data = base64.b64decode(value)
+    return db.blobs.put(data), len(data), data
+
+
+def _guess_mime(file_name):
+    return (file_name and mimetypes.guess_type(file_name)[0]) or "application/octet-stream"
+
+
+MIGRATIONS = [
+    (0, "base schema: users, family_links, user_data", _m000_base_schema),
+    (1, "blob reference columns on user_data", _m001_blob_columns),
+    (2, "move base64 attachments into the blob store", _m002_move_blobs_out),
+    (3, "fulltext index on user_data title/content", _m003_fulltext_index),
+    (4, "memory_shares table replacing copied family memories", _m004_memory_shares),
+    (5, "reminder_events delivery table", _m005_reminder_events),
+    (6, "indexed remind_at DATETIME on user_data", _m006_remind_at),
+    (7, "content_hash with unique (user_id, content_hash)", _m007_content_hash),
+    (8, "composite indexes for per-user listing and family lookups", _m008_hot_path_indexes),
+]
+
+
+def _s001_schema(db, pc):
+    # the MySQL schema as of migration 7, with an external-content FTS5 table standing in for
+    # the FULLTEXT index; triggers keep it in sync with user_data
+    pc.conn.executescript("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS family_links (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            family_id INTEGER NOT NULL REFERENCES users(id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_family_links_family ON family_links (family_id);
+        CREATE TABLE IF NOT EXISTS user_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            data_type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT,
+            date DATE,
+            time TEXT,
+            remind_at DATETIME,
+            content_hash TEXT,
+            file_name TEXT,
+            voice_hash TEXT,
+            voice_size INTEGER,
+            voice_mime TEXT,
+            file_hash TEXT,
+            file_size INTEGER,
+            file_mime TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_user_data_content_hash ON user_data (user_id, content_hash);
+        CREATE INDEX IF NOT EXISTS idx_user_data_user_remind_at ON user_data (user_id, remind_at);
+        CREATE INDEX IF NOT EXISTS idx_user_data_remind_at ON user_data (remind_at);
+        CREATE INDEX IF NOT EXISTS idx_user_data_date ON user_data (date);
+        CREATE VIRTUAL TABLE IF NOT EXISTS user_data_fts USING fts5(title, content, content='user_data', content_rowid='id');
+        CREATE TRIGGER IF NOT EXISTS user_data_fts_insert AFTER INSERT ON user_data BEGIN
+            INSERT INTO user_data_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS user_data_fts_delete AFTER DELETE ON user_data BEGIN
+            INSERT INTO user_data_fts (user_data_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS user_data_fts_update AFTER UPDATE OF title, content ON user_data BEGIN
+            INSERT INTO user_data_fts (user_data_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO user_data_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END;
+        CREATE TABLE IF NOT EXISTS memory_shares (
+            memory_id INTEGER NOT NULL REFERENCES user_data(id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (memory_id, user_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_memory_shares_user ON memory_shares (user_id, memory_id);
+        CREATE TABLE IF NOT EXISTS reminder_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            memory_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            due_at DATETIME NOT NULL,
+            title TEXT NOT NULL,
+            data_type TEXT NOT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            delivered_at DATETIME,
+            UNIQUE (memory_id, user_id, due_at)
+        );
+        CREATE INDEX IF NOT EXISTS idx_reminder_events_pending ON reminder_events (user_id, delivered_at, due_at);
+    """)
+
+
+def _s002_hot_path_indexes(db, pc):
+    # same indexes as MySQL migration 8; username is already UNIQUE in the SQLite schema
+    pc.conn.executescript("""
+        DELETE FROM family_links WHERE id NOT IN (SELECT MIN(id) FROM family_links GROUP BY user_id, family_id);
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_family_links ON family_links (user_id, family_id);
+        DROP INDEX IF EXISTS idx_family_links_family;
+        CREATE INDEX IF NOT EXISTS idx_family_links_family ON family_links (family_id, user_id);
+        CREATE INDEX IF NOT EXISTS idx_user_data_user_id ON user_data (user_id, id);
+        CREATE INDEX IF NOT EXISTS idx_user_data_user_type_id ON user_data (user_id, data_type, id);
+    """)
+
+
+SQLITE_MIGRATIONS = [
+    (1, "schema with FTS5 search over user_data", _s001_schema),
+    (2, "composite indexes for per-user listing and family lookups", _s002_hot_path_indexes),
+]
+
+
+def migrations_for(db):
+    return SQLITE_MIGRATIONS if db.backend.name == "sqlite" else MIGRATIONS
+
+
+def applied_versions(pc):
+    cursor = pc.conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    versions = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return versions
+
+
+def migrate(db):
+    ran = []
+    with db.pool.connection() as pc:
+        done = applied_versions(pc)
+        for version, name, step in migrations_for(db):
+            if version in done:
+                continue
+            print(f"⏳ Applying migration {version}: {name}")
+            step(db, pc)
+            cursor = pc.conn.cursor()
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            pc.conn.commit()
+            cursor.close()
+            ran.append(version)
+    return ran
+
+
+# (name, sql, params, must come back in index order) for the queries every page runs
+HOT_QUERIES = [
+    ("login", "SELECT * FROM users WHERE username = %s", ("alice",), False),
+    ("family members", "SELECT u.id, u.username FROM users u JOIN family_links f ON u.id = f.family_id WHERE f.user_id = %s", (1,), False),
+    ("linked to user", "SELECT u.id, u.username FROM users u JOIN family_links f ON u.id = f.user_id WHERE f.family_id = %s", (1,), False),
+    ("own memories page", "SELECT id, title FROM user_data WHERE user_id = %s ORDER BY id DESC LIMIT 50", (1,), True),
+    ("own memories by type", "SELECT id, title FROM user_data WHERE user_id = %s AND data_type = %s ORDER BY id DESC LIMIT 50",
+     (1, "medication"), True),
+    # the shared side sorts only this user's shares, so it just has to be found by index
+    ("shared memories page", "SELECT id, title FROM user_data WHERE id IN (SELECT memory_id FROM memory_shares WHERE user_id = %s) "
+                             "ORDER BY id DESC LIMIT 50", (1,), False),
+    ("memory exists", "SELECT COUNT(*) FROM user_data WHERE user_id = %s AND content_hash = %s", (1, "0" * 64), False),
+    ("share new memory", SHARE_MEMORY, (0, 1), False),
+    ("scheduled reminders", "SELECT id FROM user_data WHERE remind_at >= %s AND remind_at < %s AND id > %s",
+     ("2024-01-01 00:00:00", "2024-01-03 00:00:00", 0), False),
+    ("due reminders", "SELECT id FROM user_data WHERE user_id = %s AND remind_at >= %s AND remind_at < %s ORDER BY remind_at, id",
+     (1, "2024-01-01 00:00:00", "2024-01-08 00:00:00"), True),
+    ("pending reminder events", "SELECT id FROM reminder_events WHERE user_id = %s AND delivered_at IS NULL ORDER BY due_at", (1,), True),
+]
+
+
+def app_queries(db):
+    # the owned + shared UNIONs exactly as Database._visible builds them for this backend. The
+    # final ORDER BY merges at most limit rows per side, so only index use is checked here; the
+    # per-branch index order is covered by the "own memories" entries above.
+    pages = [
+        ("memories page", "SELECT id, title", "", (), None, 50),
+        ("memories page by type", "SELECT id, title", " AND data_type = %s", ("medication",), None, 50),
+        ("due reminders, with shared", f"SELECT {SUMMARY_COLUMNS}, remind_at", " AND remind_at >= %s AND remind_at < %s",
+         ("2024-01-01 00:00:00", "2024-01-08 00:00:00"), "remind_at, id", None),
+    ]
+    queries = []
+    for name, select, where, params, order, limit in pages:
+        sql, sql_params = db._visible_sql(1, select, where, where_params=params, order=order or "id DESC", limit=limit)
+        queries.append((name, sql, sql_params, False))
+    return queries
+
+
+# MySQL settles lookups on empty/unique keys while planning and then reports no key at all
+RESOLVED_AT_PLAN_TIME = ("no matching row in const table", "Impossible WHERE", "Select tables optimized away")
+
+
+def _mysql_plan_problems(pc, sql, params, ordered):
+    cursor = pc.conn.cursor(dictionary=True)
+    cursor.execute("EXPLAIN " + sql, params)
+    plan = cursor.fetchall()
+    cursor.close()
+    problems = []
+    for row in plan:
+        table, extra = row.get('table'), row.get('Extra') or ""
+        if not table or table.startswith("<") or any(s in extra for s in RESOLVED_AT_PLAN_TIME):
+            continue
+        if row.get('select_type') == "INSERT":
+            # the target of INSERT ... SELECT is listed as type ALL, but it is only written to
+            continue
+        if row.get('type') == "ALL":
+            problems.append(f"full scan of {table} (possible keys: {row.get('possible_keys') or 'none'})")
+        if ordered and "Using filesort" in extra:
+            problems.append(f"sorts {table} instead of reading it in index order")
+    return problems
+
+
+def _sqlite_plan_problems(pc, sql, params, ordered):
+    cursor = pc.conn.cursor()
+    cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+    plan = [row[3] for row in cursor.fetchall()]
+    cursor.close()
+    problems = []
+    for detail in plan:
+        m = re.match(r"SCAN (\w+)", detail)
+        if m and "INDEX" not in detail:
+            problems.append(f"full scan of {m.group(1)}")
+        elif m:
+            problems.append(f"reads all of {m.group(1)} through an index ({detail})")
+        if ordered and "TEMP B-TREE FOR ORDER BY" in detail:
+            problems.append("sorts rows instead of reading them in index order")
+    return problems
+
+
+def check_indexes(db, queries=None):
+    # -> {query name: [problems]}; empty lists mean the plan is index-only. MySQL plans depend
+    # on table statistics, so run this against realistic data (e.g. `bench.py --keep`).
+    if queries is None:
+        queries = HOT_QUERIES + app_queries(db)
+    explain = _sqlite_plan_problems if db.backend.name == "sqlite" else _mysql_plan_problems
+    with db.pool.connection() as pc:
+        return {name: explain(pc, sql, params, ordered) for name, sql, params, ordered in queries}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check", action="store_true", help="EXPLAIN the hot queries after migrating")
+    parser.add_argument("--gc", action="store_true", help="delete attachment files no memory refers to")
+    parser.add_argument("--grace", type=float, default=3600, help="--gc keeps files younger than this many seconds")
+    args = parser.parse_args()
+    db = Database()
+    ran = migrate(db)
+    print(f"✅ Applied migrations: {ran}" if ran else "✅ Schema is up to date")
+    if args.gc:
+        print(f"🧹 Removed {db.collect_blobs(args.grace)} unreferenced attachment files")
+    if args.check:
+        results = check_indexes(db)
+        for name, problems in results.items():
+            print(f"❌ {name}: " + "; ".join(problems) if problems else f"✅ {name}")
+        db.close()
+        sys.exit(1 if any(results.values()) else 0)
+    db.close()
@@ -0,0 +1,104 @@
+# ✅ mock_llm_server.py - tiny OpenAI-compatible chat server for local testing without a real model
+# Run `python mock_llm_server.py --port 8765 --delay 0.05`, then start the app with
+# PMA_LLM_BASE_URL=http://127.0.0.1:8765/v1 PMA_LLM_API_KEY=mock to see streamed, stoppable replies. --stall and
+# --status make it misbehave (a stream that stops after the first word, an HTTP error) for tests.
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def reply_for(messages):
+    # echoes the last user message so tests can predict the answer
+    last = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    return f"You said: {last}"
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    delay = 0.05
+    stall = 0.0
+    status = 200
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.status != 200:
+            self._json({"error": {"message": "mock failure", "type": "server_error"}}, self.status)
+            return
+        text = reply_for(body.get("messages", []))
+        model = body.get("model", "mock")
+        if body.get("stream"):
+            self._stream(model, text)
+        else:
+            self._json({
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(text.split()), "total_tokens": len(text.split())},
+            })
+
+    def _json(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, model, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        words = text.split(" ")
+        try:
+            for i, word in enumerate(words):
+                delta = {"content": word + (" " if i < len(words) - 1 else "")}
+                if i == 0:
+                    delta["role"] = "assistant"
+                self._event({"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                time.sleep(self.stall if i == 0 and self.stall else self.delay)
+            self._event({"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # the client cancelled the stream
+            pass
+        self.close_connection = True
+
+    def _event(self, payload):
+        self.wfile.write(b"data: " + json.dumps(payload).encode() + b"\n\n")
+        self.wfile.flush()
+
+
+def start(port=0, delay=0.05, stall=0.0, status=200):
+    # starts the server on a background thread and returns it; server.server_address has the port.
+    # stall: seconds to go quiet after the first streamed word; status: answer every request with it
+    handler = type("Handler", (MockHandler,), {"delay": delay, "stall": stall, "status": status})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds between streamed words")
+    parser.add_argument("--stall", type=float, default=0.0, help="seconds to go quiet after the first word")
+    parser.add_argument("--status", type=int, default=200, help="HTTP status to fail every request with")
+    args = parser.parse_args()
+    server = start(args.port, args.delay, args.stall, args.status)
+    print(f"🤖 Mock LLM on http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,135 @@
+# ✅ passwords.py - bcrypt hashing/verification on a bounded process pool
+# so a burst of logins doesn't stall every other session's script thread
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+from metrics import QUERY_METRICS
+
+BCRYPT_ROUNDS = int(os.getenv("PMA_BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("PMA_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+_executor = None
+_executor_lock = threading.Lock()
+# callers beyond this many in-flight jobs wait instead of queueing up unbounded work
+_in_flight = threading.BoundedSemaphore(HASH_WORKERS * 4)
+
+
+def _hash_job(password, rounds):
+    start = time.process_time()
+    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+    return hashed, time.process_time() - start
+
+
+def _check_job(password, hashed, rounds):
+    # verifies and, when the stored cost differs from the configured one, rehashes in the same job
+    start = time.process_time()
+    ok = bcrypt.checkpw(password.encode(), hashed.encode())
+    new_hash = None
+    if ok and hash_rounds(hashed) != rounds:
+        new_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+    return ok, new_hash, time.process_time() - start
+
+
+def hash_rounds(hashed):
+    # "$2b$12$..." -> 12
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn, not fork: the Streamlit server is multi-threaded
+            _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _run(job, *args):
+    with _in_flight:
+        try:
+            return _pool().submit(job, *args).result()
+        except BrokenProcessPool:
+            shutdown()
+            return job(*args)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+class LoginMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.failures = 0
+        self.rehashes = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.cpu_total = 0.0
+
+    def record(self, latency, cpu, ok, rehashed):
+        with self._lock:
+            self.count += 1
+            self.failures += 0 if ok else 1
+            self.rehashes += 1 if rehashed else 0
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.cpu_total += cpu
+
+    def stats(self):
+        with self._lock:
+            n = self.count or 1
+            return {
+                "logins": self.count,
+                "failures": self.failures,
+                "rehashes": self.rehashes,
+                "avg_latency_s": self.latency_total / n,
+                "max_latency_s": self.latency_max,
+                "avg_cpu_s": self.cpu_total / n,
+            }
+
+    def prometheus(self):
+        with self._lock:
+            values = [
+                ("pma_login_checks_total", "counter", "Password checks", self.count),
+                ("pma_login_failures_total", "counter", "Password checks that did not match", self.failures),
+                ("pma_login_rehashes_total", "counter", "Hashes upgraded to the configured bcrypt cost", self.rehashes),
+                ("pma_login_seconds_total", "counter", "Wall time spent checking passwords", self.latency_total),
+                ("pma_login_cpu_seconds_total", "counter", "bcrypt CPU time spent checking passwords", self.cpu_total),
+                ("pma_login_max_seconds", "gauge", "Slowest password check", self.latency_max),
+            ]
+        lines = []
+        for metric, kind, help_text, value in values:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {value}"]
+        return lines
+
+
+LOGIN_METRICS = LoginMetrics()
+# served with the Database metrics: snapshot()["logins"], pma_login_* in /metrics
+QUERY_METRICS.register("logins", LOGIN_METRICS)
+
+
+def hash_password(password, rounds=None):
+    hashed, _ = _run(_hash_job, password, rounds or BCRYPT_ROUNDS)
+    return hashed
+
+
+def check_password(password, hashed, rounds=None):
+    # -> (ok, new_hash); new_hash is set when the stored hash should be replaced
+    start = time.perf_counter()
+    ok, new_hash, cpu = _run(_check_job, password, hashed, rounds or BCRYPT_ROUNDS)
+    LOGIN_METRICS.record(time.perf_counter() - start, cpu, ok, new_hash is not None)
+    return ok, new_hash
@@ -0,0 +1,149 @@
+# ✅ pool.py - small connection pool with checkout timeout, liveness checks
+# and a per-connection cache of prepared statements; connections come from a backends.py backend
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class PoolError(Exception):
+    pass
+
+
+class PoolTimeout(PoolError):
+    pass
+
+
+class PooledConnection:
+    def __init__(self, conn, max_statements, errors=(Exception,)):
+        self.conn = conn
+        self.last_used = time.monotonic()
+        self.max_statements = max_statements
+        self.statements = OrderedDict()
+        self.errors = errors
+
+    def cursor(self, sql, dictionary=False):
+        # mysql.connector prepares a statement once per cursor and re-uses it as long as
+        # the same SQL is executed again, so keep one prepared cursor per SQL string
+        # (SQLite connections ignore prepared=True and rely on their own statement cache)
+        key = (sql, dictionary)
+        cur = self.statements.get(key)
+        if cur is not None:
+            self.statements.move_to_end(key)
+            return cur
+        cur = self.conn.cursor(prepared=True, dictionary=dictionary)
+        self.statements[key] = cur
+        if len(self.statements) > self.max_statements:
+            _, old = self.statements.popitem(last=False)
+            self._close_cursor(old)
+        return cur
+
+    def reset_statements(self):
+        for cur in self.statements.values():
+            self._close_cursor(cur)
+        self.statements.clear()
+
+    def close(self):
+        self.reset_statements()
+        try:
+            self.conn.close()
+        except self.errors:
+            pass
+
+    def _close_cursor(self, cur):
+        try:
+            cur.close()
+        except self.errors:
+            pass
+
+
+class ConnectionPool:
+    def __init__(self, backend, size=5, timeout=10.0, ping_after=30.0, max_statements=64):
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.max_statements = max_statements
+        # on_acquire(seconds): called with how long each checkout waited (slot, ping or connect)
+        self.on_acquire = None
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _new(self):
+        return PooledConnection(self.backend.connect(), self.max_statements, self.backend.Error)
+
+    def _alive(self, pc):
+        # only ping connections that sat idle long enough to have been dropped by the server
+        if time.monotonic() - pc.last_used < self.ping_after:
+            return True
+        try:
+            pc.conn.ping(reconnect=False)
+            return True
+        except self.backend.Error:
+            return False
+
+    def acquire(self):
+        start = time.perf_counter()
+        pc = self._checkout()
+        if self.on_acquire is not None:
+            self.on_acquire(time.perf_counter() - start)
+        return pc
+
+    def _checkout(self):
+        if self._closed:
+            raise PoolError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No free connection within {self.timeout}s (pool size {self.size})")
+        try:
+            while True:
+                try:
+                    pc = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._new()
+                if self._alive(pc):
+                    return pc
+                pc.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, pc, discard=False):
+        try:
+            if discard or self._closed:
+                pc.close()
+                return
+            try:
+                if pc.conn.in_transaction:
+                    pc.conn.rollback()
+            except self.backend.Error:
+                pc.close()
+                return
+            pc.last_used = time.monotonic()
+            self._idle.put(pc)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        pc = self.acquire()
+        try:
+            yield pc
+        except self.backend.Error:
+            # the connection may be in an unknown state after a driver error
+            self.release(pc, discard=not pc.conn.is_connected())
+            raise
+        except BaseException:
+            self.release(pc)
+            raise
+        else:
+            self.release(pc)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
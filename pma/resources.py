@@ -0,0 +1,120 @@
+# ✅ resources.py - process-wide registry for the DB pool and the LLM client
+# Streamlit re-executes app5.py on every interaction; module state survives, so expensive
+# resources are built once here, health-checked now and then, rebuilt when broken and closed at exit.
+import atexit
+import threading
+import time
+
+import metrics
+import passwords
+from database import Database
+from llm import make_client
+from llm_cache import REPLY_CACHE
+from memory_index import MEMORY_INDEX
+
+CHECK_EVERY = 30.0
+# a broken resource is rebuilt at most this often instead of on every rerun
+RETRY_EVERY = 5.0
+
+
+class Resource:
+    def __init__(self, factory, check=None, close=None):
+        self.factory = factory
+        self.check = check
+        self.close = close
+        self.value = None
+        self.healthy = False
+        self.checked_at = 0.0
+        # held while building or checking this resource; never while holding the registry lock
+        self.lock = threading.Lock()
+
+
+class ResourceRegistry:
+    def __init__(self, check_every=CHECK_EVERY, retry_every=RETRY_EVERY):
+        self.check_every = check_every
+        self.retry_every = retry_every
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory, check=None, close=None):
+        with self._lock:
+            self._resources.setdefault(name, Resource(factory, check, close))
+
+    def _due(self, res, now):
+        # healthy resources are re-checked every check_every seconds, broken ones every retry_every
+        if res.check is None:
+            return False
+        return now - res.checked_at >= (self.check_every if res.healthy else self.retry_every)
+
+    def get(self, name):
+        with self._lock:
+            res = self._resources[name]
+        if res.value is not None and not self._due(res, time.monotonic()):
+            return res.value
+        # one thread builds/checks; others keep using the current value, or wait if there is none yet
+        if not res.lock.acquire(blocking=res.value is None):
+            return res.value
+        try:
+            if res.value is None:
+                res.value = res.factory()
+                res.healthy = res.check is None
+                res.checked_at = 0.0
+            if self._due(res, time.monotonic()):
+                res.healthy = self._check(res)
+                if not res.healthy:
+                    self._close(res)
+                    res.value = None
+                    res.value = res.factory()
+                    res.healthy = self._check(res)
+                res.checked_at = time.monotonic()
+            return res.value
+        finally:
+            res.lock.release()
+
+    def healthy(self, name):
+        with self._lock:
+            return self._resources[name].healthy
+
+    def shutdown(self):
+        with self._lock:
+            resources = list(self._resources.values())
+        for res in reversed(resources):
+            with res.lock:
+                self._close(res)
+                res.value = None
+
+    @staticmethod
+    def _check(res):
+        try:
+            return bool(res.check(res.value))
+        except Exception as e:
+            print("⚠️ Resource health check failed:", e)
+            return False
+
+    @staticmethod
+    def _close(res):
+        if res.value is not None and res.close is not None:
+            try:
+                res.close(res.value)
+            except Exception as e:
+                print("⚠️ Closing resource failed:", e)
+
+
+REGISTRY = ResourceRegistry()
+REGISTRY.register("db", lambda: Database(listeners=[MEMORY_INDEX, REPLY_CACHE]),
+                  check=lambda db: db.ping(), close=lambda db: db.close())
+REGISTRY.register("llm", make_client, check=lambda c: not c.is_closed(), close=lambda c: c.close())
+atexit.register(REGISTRY.shutdown)
+atexit.register(passwords.shutdown)
+# PMA_METRICS_PORT exposes Database query metrics at /metrics (Prometheus) and /metrics.json
+REGISTRY.register("metrics", lambda: metrics.serve(metrics.METRICS_PORT), close=lambda server: server.shutdown())
+if metrics.METRICS_PORT:
+    REGISTRY.get("metrics")
+
+
+def database():
+    return REGISTRY.get("db")
+
+
+def llm_client():
+    return REGISTRY.get("llm")
@@ -0,0 +1,137 @@
+# ✅ scheduler.py - out-of-band reminder scheduler, run next to the app with `python scheduler.py`
+# Upcoming reminders for all users sit in a min-heap; due ones are written to reminder_events,
+# which the dashboard polls with one indexed query per render. It also removes attachment files
+# no memory points to any more (deleted memories, "Clear All Memories") every PMA_BLOB_GC_EVERY seconds.
+import heapq
+import os
+import signal
+import threading
+from datetime import datetime, timedelta
+
+from database import Database
+
+BLOB_GC_EVERY = float(os.getenv("PMA_BLOB_GC_EVERY", "3600"))
+BLOB_GC_GRACE = float(os.getenv("PMA_BLOB_GC_GRACE", "3600"))
+
+
+class ReminderScheduler:
+    def __init__(self, db, horizon_days=2, refresh_every=30.0, catch_up=timedelta(minutes=5), rescan_every=None,
+                 retry_after=1.0, max_backoff=60.0, gc_every=BLOB_GC_EVERY, gc_grace=BLOB_GC_GRACE):
+        self.db = db
+        # attachments of deleted memories are removed this often, once older than gc_grace seconds
+        self.gc_every = gc_every
+        self.gc_grace = gc_grace
+        # seconds to wait after a database error, doubling per consecutive failure up to max_backoff
+        self.retry_after = retry_after
+        self.max_backoff = max_backoff
+        self.horizon_days = horizon_days
+        self.refresh_every = refresh_every
+        self.catch_up = catch_up
+        # ids are handed out before commit, so a row can become visible after a higher id was
+        # already seen. Rescanning the whole window this often finds those while they are still
+        # inside the catch-up window.
+        self.rescan_every = rescan_every or catch_up / 2
+        self.heap = []
+        self.scheduled = set()
+        # (memory_id, due_at) fired within the catch-up window, so a rescan doesn't fire them again
+        self.fired = set()
+        self.last_id = 0
+        self.loaded_through = None
+        self.rescanned_at = None
+        self.stopped = threading.Event()
+
+    def _push(self, rows, now):
+        for r in rows:
+            due_at = r['remind_at']
+            key = (r['id'], due_at)
+            # anything older than the catch-up window was missed long ago, don't alert for it now
+            if due_at < now - self.catch_up or key in self.scheduled or key in self.fired:
+                continue
+            self.scheduled.add(key)
+            heapq.heappush(self.heap, (due_at, r['id']))
+
+    def refresh(self, now=None):
+        now = now or datetime.now()
+        start = now - self.catch_up
+        # the window ends on a day boundary so it only has to be extended once a day
+        through = datetime.combine(now.date() + timedelta(days=self.horizon_days + 1), datetime.min.time())
+        max_id = self.db.get_max_memory_id()
+        self.fired = {key for key in self.fired if key[1] >= start}
+        if self.loaded_through is None or now - self.rescanned_at >= self.rescan_every:
+            # first load, or the periodic rescan: the whole window
+            self._push(self.db.get_scheduled_reminders(start, through, 0, max_id), now)
+            self.rescanned_at = now
+        else:
+            # new memories inside the window we already hold
+            if max_id > self.last_id:
+                self._push(self.db.get_scheduled_reminders(start, self.loaded_through, self.last_id, max_id), now)
+            # time that just slid into the window
+            if through > self.loaded_through:
+                self._push(self.db.get_scheduled_reminders(self.loaded_through, through, 0, max_id), now)
+        self.last_id = max(self.last_id, max_id)
+        self.loaded_through = through
+
+    def fire_due(self, now=None):
+        now = now or datetime.now()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            due.append(heapq.heappop(self.heap))
+        if not due:
+            return []
+        try:
+            self.db.emit_reminder_events([(memory_id, due_at) for due_at, memory_id in due])
+        except BaseException:
+            # nothing was committed: keep them queued so the next attempt fires them
+            for entry in due:
+                heapq.heappush(self.heap, entry)
+            raise
+        for due_at, memory_id in due:
+            self.scheduled.discard((memory_id, due_at))
+            self.fired.add((memory_id, due_at))
+        return [(memory_id, due_at) for due_at, memory_id in due]
+
+    def collect_blobs(self):
+        removed = self.db.collect_blobs(self.gc_grace)
+        if removed:
+            print(f"🧹 Removed {removed} unreferenced attachment files")
+        return removed
+
+    def run(self):
+        next_refresh = next_gc = datetime.now()
+        failures = 0
+        while not self.stopped.is_set():
+            now = datetime.now()
+            try:
+                if now >= next_refresh:
+                    self.refresh(now)
+                    next_refresh = now + timedelta(seconds=self.refresh_every)
+                for memory_id, due_at in self.fire_due(now):
+                    print(f"🔔 Reminder {memory_id} due at {due_at:%Y-%m-%d %H:%M}")
+                if now >= next_gc:
+                    self.collect_blobs()
+                    next_gc = now + timedelta(seconds=self.gc_every)
+                failures = 0
+            except self.db.errors as e:
+                # the database is down or the pool is exhausted: back off and try again
+                failures += 1
+                delay = min(self.max_backoff, self.retry_after * 2 ** (failures - 1))
+                print(f"⚠️ Reminder scheduler failed ({e}), retrying in {delay:.1f}s")
+                self.stopped.wait(delay)
+                continue
+            wake = min(next_refresh, next_gc)
+            if self.heap:
+                wake = min(wake, self.heap[0][0])
+            self.stopped.wait(max(0.0, (wake - datetime.now()).total_seconds()))
+
+    def stop(self, *_):
+        self.stopped.set()
+
+
+if __name__ == "__main__":
+    db = Database(pool_size=2)
+    scheduler = ReminderScheduler(db)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    print("⏰ Reminder scheduler running")
+    scheduler.run()
+    db.close()
@@ -0,0 +1,61 @@
+# ✅ conftest.py - shared fixtures; the suite needs no MySQL server and no LLM API key
+# Every Database here runs on a throwaway SQLite file, LLM calls go to mock_llm_server.py.
+# Run from the repository root or pma/ with `python -m pytest`.
+import os
+import sys
+import tempfile
+
+import pytest
+
+PMA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PMA_DIR)
+
+# module-level settings are read at import time, so they are set before anything is imported
+_scratch = tempfile.mkdtemp(prefix="pma-tests-")
+os.environ.setdefault("PMA_DB_BACKEND", "sqlite")
+os.environ.setdefault("PMA_SQLITE_PATH", os.path.join(_scratch, "memory_assistant.sqlite3"))
+os.environ.setdefault("PMA_BLOB_DIR", os.path.join(_scratch, "blobs"))
+os.environ.setdefault("PMA_LLM_CACHE", os.path.join(_scratch, "llm_cache.sqlite3"))
+os.environ.setdefault("PMA_BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PMA_HASH_WORKERS", "1")
+os.environ.setdefault("PMA_SLOW_QUERY_MS", "60000")
+
+import passwords  # noqa: E402
+from backends import SQLiteBackend  # noqa: E402
+from blobstore import BlobStore  # noqa: E402
+from cache import TTLCache, VersionedCache  # noqa: E402
+from database import Database  # noqa: E402
+from metrics import QueryMetrics  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _hash_pool():
+    yield
+    passwords.shutdown()
+
+
+def make_db(path, blob_dir, **kwargs):
+    kwargs.setdefault("result_cache", VersionedCache())
+    kwargs.setdefault("lookup_cache", TTLCache())
+    kwargs.setdefault("metrics", QueryMetrics())
+    return Database(backend=SQLiteBackend(str(path)), blobs=BlobStore(str(blob_dir)), **kwargs)
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = make_db(tmp_path / "test.sqlite3", tmp_path / "blobs")
+    migrate(database)
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def users(db):
+    # alice's memories are shared with bob (bob linked alice as family); carol is unrelated
+    ids = {}
+    for name in ("alice", "bob", "carol"):
+        assert db.create_user(name, "secret")
+        ids[name] = db.get_user(name)['id']
+    assert db.link_family_member(ids["bob"], "alice")
+    return ids
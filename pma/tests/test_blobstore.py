@@ -0,0 +1,75 @@
+import hashlib
+import os
+import time
+
+from blobstore import BlobStore, sniff_audio_mime
+from scheduler import ReminderScheduler
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    store = BlobStore(str(tmp_path))
+    digest = store.put(b"voice note")
+    assert store.put(b"voice note") == digest == hashlib.sha256(b"voice note").hexdigest()
+    assert store.path(digest) == os.path.join(str(tmp_path), digest[:2], digest[2:4], digest)
+    assert store.get(digest) == b"voice note"
+    assert sum(len(files) for _, _, files in os.walk(tmp_path)) == 1
+
+
+def test_gc_keeps_referenced_and_recent_blobs(tmp_path):
+    store = BlobStore(str(tmp_path))
+    kept, dropped, recent = store.put(b"kept"), store.put(b"dropped"), store.put(b"recent")
+    old = time.time() - 7200
+    for digest in (kept, dropped):
+        os.utime(store.path(digest), (old, old))
+    assert store.gc({kept}, grace_seconds=3600) == 1
+    assert store.exists(kept) and store.exists(recent)
+    assert not store.exists(dropped)
+
+
+def test_sniff_audio_mime():
+    assert sniff_audio_mime(b"RIFF....WAVE") == "audio/wav"
+    assert sniff_audio_mime(b"ID3\x04") == "audio/mpeg"
+    assert sniff_audio_mime(b"\xff\xfb\x90") == "audio/mpeg"
+
+
+def test_attachments_round_trip_through_the_database(db, users):
+    assert db.add_data(users["alice"], "document", "Lease", "flat lease", file_data=b"%PDF-1.4", file_name="lease.pdf",
+                       voice_note=b"RIFF0000WAVE")
+    memory = db.get_user_data(users["alice"])[0]
+    assert memory['file_mime'] == "application/octet-stream" and memory['voice_mime'] == "audio/wav"
+    attachment = db.get_attachment(memory['id'])
+    assert attachment['file_data'] == b"%PDF-1.4"
+    assert attachment['voice_note'] == b"RIFF0000WAVE"
+
+
+def test_collect_blobs_drops_files_of_deleted_memories(db, users):
+    db.add_data(users["alice"], "document", "Lease", "flat lease", file_data=b"lease")
+    db.add_data(users["alice"], "document", "Deed", "house deed", file_data=b"deed")
+    lease = next(m for m in db.get_user_data(users["alice"]) if m['title'] == "Lease")
+    db.delete_memory(lease['id'], users["alice"])
+    assert db.collect_blobs(grace_seconds=0) == 1
+    assert not db.blobs.exists(lease['file_hash'])
+    assert db.get_attachment(db.get_user_data(users["alice"])[0]['id'])['file_data'] == b"deed"
+
+
+def test_duplicate_memory_stores_no_blob(db, users):
+    assert db.add_data(users["alice"], "document", "Lease", "flat lease", file_data=b"first scan")
+    assert not db.add_data(users["alice"], "document", "Lease", "flat lease", file_data=b"second scan")
+    assert not db.blobs.exists(hashlib.sha256(b"second scan").hexdigest())
+    assert db.collect_blobs(grace_seconds=0) == 0
+
+
+def test_missing_blob_file_reads_as_none(db, users):
+    db.add_data(users["alice"], "document", "Lease", "flat lease", file_data=b"lease")
+    memory = db.get_user_data(users["alice"])[0]
+    os.remove(db.blobs.path(memory['file_hash']))
+    assert db.read_blob(memory['file_hash']) is None
+    assert db.get_attachment(memory['id'])['file_data'] is None
+
+
+def test_scheduler_collects_attachments_of_cleared_memories(db, users):
+    db.add_data(users["alice"], "document", "Lease", "flat lease", file_data=b"lease", voice_note=b"RIFF")
+    memory = db.get_user_data(users["alice"])[0]
+    db.delete_all_user_data(users["alice"])
+    assert ReminderScheduler(db, gc_grace=0).collect_blobs() == 2
+    assert not db.blobs.exists(memory['file_hash']) and not db.blobs.exists(memory['voice_hash'])
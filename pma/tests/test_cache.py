@@ -0,0 +1,106 @@
+import time
+
+from cache import TTLCache, VersionedCache
+
+
+def test_versioned_cache_bump_drops_the_users_entries():
+    cache = VersionedCache()
+    cache.put(1, cache.version(1), "page", ["a"])
+    cache.put(2, cache.version(2), "page", ["b"])
+    assert cache.get(1, cache.version(1), "page") == (True, ["a"])
+    cache.bump(1)
+    assert cache.get(1, cache.version(1), "page") == (False, None)
+    assert cache.get(2, cache.version(2), "page") == (True, ["b"])
+    assert cache.stats()["entries"] == 1
+
+
+def test_versioned_cache_ignores_results_read_before_a_write():
+    cache = VersionedCache()
+    version = cache.version(1)
+    cache.bump(1)
+    cache.put(1, version, "page", ["stale"])
+    assert cache.stats()["entries"] == 0
+
+
+def test_versioned_cache_evicts_least_recently_used():
+    cache = VersionedCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(1, 0, key, key)
+    cache.get(1, 0, "a")
+    cache.put(1, 0, "c", "c")
+    assert cache.get(1, 0, "b") == (False, None)
+    assert cache.get(1, 0, "a") == (True, "a")
+
+
+def test_database_reads_are_cached_until_a_write(db, users):
+    alice, bob = users["alice"], users["bob"]
+    db.add_data(alice, "othernote", "Keys", "blue drawer")
+    assert [m['title'] for m in db.get_user_data(bob)] == ["Keys"]
+    hits = db.result_cache.stats()["hits"]
+    rows = db.get_user_data(bob)
+    assert db.result_cache.stats()["hits"] == hits + 1
+    # callers get copies of the cached rows
+    rows[0]['title'] = "changed"
+    assert db.get_user_data(bob)[0]['title'] == "Keys"
+    # alice's write is visible to bob, whose copy of the memory changed too
+    db.add_data(alice, "othernote", "Passport", "top shelf")
+    assert [m['title'] for m in db.get_user_data(bob)] == ["Passport", "Keys"]
+
+
+def test_every_visible_write_bumps_the_readers_version(db, users):
+    # app5's search page drops its loaded pages when this version changes
+    alice, bob = users["alice"], users["bob"]
+    seen = [db.result_cache.version(bob)]
+
+    def bumped():
+        seen.append(db.result_cache.version(bob))
+        return seen[-1] != seen[-2]
+
+    db.add_data(alice, "othernote", "Keys", "blue drawer")
+    assert bumped()
+    db.add_data_bulk([{'user_id': alice, 'data_type': "othernote", 'title': "Gym", 'content': "locker 4411"}])
+    assert bumped()
+    db.delete_memory(db.get_user_data(alice)[0]['id'], alice)
+    assert bumped()
+    db.link_family_member(bob, "carol")
+    assert bumped()
+    db.delete_all_user_data(alice)
+    assert bumped()
+    db.create_user("dave", "secret")
+    db.add_data(db.get_user("dave")['id'], "othernote", "Unrelated", "not linked to bob")
+    assert not bumped()
+
+
+
+def test_ttl_cache_expires_and_invalidates():
+    cache = TTLCache(ttl=0.05)
+    cache.put("k", 1)
+    assert cache.get("k") == (True, 1)
+    time.sleep(0.06)
+    assert cache.get("k") == (False, None)
+    generation = cache.generation()
+    cache.invalidate("k")
+    cache.put("k", "loaded before the invalidation", generation)
+    assert cache.get("k") == (False, None)
+
+
+def test_family_lookups_are_cached_and_dropped_on_link(db, users):
+    assert db.get_family_members(users["carol"]) == []
+    assert db.link_family_member(users["carol"], "alice")
+    assert [m['username'] for m in db.get_family_members(users["carol"])] == ["alice"]
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+
+
+def test_new_user_replaces_a_cached_miss(db):
+    assert db.get_user("erin") is None
+    assert db.create_user("erin", "secret")
+    assert db.get_user("erin")['username'] == "erin"
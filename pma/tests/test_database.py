@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+NOW = datetime(2024, 5, 17, 9, 0)
+
+
+def add_reminder(db, user_id, title, at):
+    assert db.add_data(user_id, "medication", title, f"{title} dose", at.date(), at.strftime("%H:%M"))
+
+
+def test_owner_deletes_for_everyone(db, users):
+    db.add_data(users["alice"], "othernote", "Keys", "blue drawer")
+    memory_id = db.get_user_data(users["alice"])[0]['id']
+    assert db.delete_memory(memory_id, users["alice"])
+    assert db.get_user_data(users["alice"]) == db.get_user_data(users["bob"]) == []
+
+
+def test_family_member_only_removes_their_share(db, users):
+    db.add_data(users["alice"], "othernote", "Keys", "blue drawer")
+    memory_id = db.get_user_data(users["alice"])[0]['id']
+    assert db.delete_memory(memory_id, users["bob"])
+    assert db.get_user_data(users["bob"]) == []
+    assert [m['id'] for m in db.get_user_data(users["alice"])] == [memory_id]
+
+
+def test_delete_memory_reports_a_no_op(db, users):
+    db.add_data(users["alice"], "othernote", "Keys", "blue drawer")
+    memory_id = db.get_user_data(users["alice"])[0]['id']
+    # not carol's memory, and not shared with her
+    assert not db.delete_memory(memory_id, users["carol"])
+    assert db.delete_memory(memory_id)
+    assert not db.delete_memory(memory_id)
+    assert not db.delete_memory(memory_id, users["alice"])
+
+
+def test_due_reminders_include_shared_rows_in_time_order(db, users):
+    alice, bob, carol = users["alice"], users["bob"], users["carol"]
+    add_reminder(db, alice, "Insulin", NOW + timedelta(hours=2))
+    add_reminder(db, bob, "Vitamins", NOW + timedelta(hours=1))
+    add_reminder(db, carol, "Allergy", NOW + timedelta(hours=1))
+    add_reminder(db, alice, "Tomorrow", NOW + timedelta(days=1))
+    add_reminder(db, bob, "Yesterday", NOW - timedelta(days=1))
+    assert db.add_data(alice, "othernote", "Keys", "no reminder time")
+    end = NOW + timedelta(hours=3)
+
+    def due(user_id, **kwargs):
+        return [(r['title'], r['remind_at']) for r in db.get_due_reminders(user_id, NOW, end, **kwargs)]
+
+    assert due(bob) == [("Vitamins", NOW + timedelta(hours=1)), ("Insulin", NOW + timedelta(hours=2))]
+    assert due(bob, limit=1) == [("Vitamins", NOW + timedelta(hours=1))]
+    assert due(alice) == [("Insulin", NOW + timedelta(hours=2))]
+    assert due(carol) == [("Allergy", NOW + timedelta(hours=1))]
+    # the range is half-open
+    assert [r['title'] for r in db.get_due_reminders(bob, NOW + timedelta(hours=1), NOW + timedelta(hours=2))] == ["Vitamins"]
+    # a removed share drops out of bob's reminders only
+    insulin = next(m['id'] for m in db.get_user_data(alice) if m['title'] == "Insulin")
+    assert db.delete_memory(insulin, bob)
+    assert [t for t, _ in due(bob)] == ["Vitamins"] and [t for t, _ in due(alice)] == ["Insulin"]
@@ -0,0 +1,48 @@
+import io
+import json
+from datetime import date
+
+from importer import import_memories, iter_csv, iter_json, to_rows
+
+RECORDS = [
+    {"title": "Insulin", "content": "10 units before dinner", "type": "medication", "date": "2024-05-17", "time": "18:30"},
+    {"title": "Home", "body": "12 Elm Street", "data_type": "address"},
+    {"title": "", "content": "no title"},
+    {"title": "Bad date", "content": "x", "date": "17/05/2024"},
+    {"title": "Odd type", "content": "kept as a note", "type": "recipe"},
+]
+
+
+def test_iter_json_reads_arrays_in_small_chunks():
+    data = json.dumps(RECORDS).encode("utf-8-sig")
+    assert list(iter_json(io.BytesIO(data), chunk_size=7)) == RECORDS
+
+
+def test_iter_json_reads_json_lines():
+    data = "\n".join(json.dumps(r) for r in RECORDS).encode()
+    assert list(iter_json(io.BytesIO(data), chunk_size=16)) == RECORDS
+
+
+def test_iter_csv_strips_the_bom():
+    data = "﻿title,content\nKeys,blue drawer\n".encode()
+    assert list(iter_csv(io.BytesIO(data))) == [{"title": "Keys", "content": "blue drawer"}]
+
+
+def test_to_rows_maps_and_skips():
+    rows, skipped = to_rows(RECORDS, user_id=7)
+    rows = list(rows)
+    assert skipped[0] == 2
+    assert rows[0] == {'user_id': 7, 'data_type': 'medication', 'title': 'Insulin', 'content': '10 units before dinner',
+                       'date': date(2024, 5, 17), 'time': '18:30'}
+    assert rows[1]['content'] == "12 Elm Street" and rows[1]['data_type'] == "address"
+    assert rows[2]['data_type'] == "othernote"
+
+
+def test_import_memories_shares_and_skips_duplicates(db, users):
+    data = json.dumps(RECORDS).encode()
+    result = import_memories(db, users["alice"], io.BytesIO(data), "json", chunk_size=2)
+    assert result == {"inserted": 3, "duplicates": 0, "skipped": 2}
+    again = import_memories(db, users["alice"], io.BytesIO(data), "json")
+    assert again == {"inserted": 0, "duplicates": 3, "skipped": 2}
+    assert {m['title'] for m in db.get_user_data(users["bob"])} == {"Insulin", "Home", "Odd type"}
+    assert db.get_user_data(users["carol"]) == []
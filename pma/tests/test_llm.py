@@ -0,0 +1,85 @@
+import openai
+import pytest
+
+import llm
+import mock_llm_server
+from chat_history import ChatHistory, llm_summarizer
+from llm import ReplyTimeout, stream_completion
+
+MESSAGES = [{"role": "user", "content": "where are my keys"}]
+
+
+@pytest.fixture
+def mock_client():
+    servers = []
+
+    def start(**kwargs):
+        kwargs.setdefault("delay", 0.001)
+        server = mock_llm_server.start(**kwargs)
+        servers.append(server)
+        return openai.OpenAI(api_key="test", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", max_retries=0)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_stream_yields_the_whole_reply(mock_client):
+    parts = list(stream_completion(mock_client(), "mock", MESSAGES, timeout=5))
+    assert len(parts) > 1
+    assert "".join(parts) == "You said: where are my keys"
+
+
+def test_stalled_stream_raises_reply_timeout(mock_client):
+    client = mock_client(stall=2.0)
+    parts = []
+    with pytest.raises(ReplyTimeout):
+        for part in stream_completion(client, "mock", MESSAGES, timeout=0.3):
+            parts.append(part)
+    # what arrived before the stall is kept by the caller
+    assert parts == ["You "]
+
+
+def test_slow_stream_past_the_deadline_raises_reply_timeout(mock_client):
+    # every word arrives within the read timeout, the reply as a whole does not
+    client = mock_client(delay=0.15)
+    with pytest.raises(ReplyTimeout):
+        list(stream_completion(client, "mock", MESSAGES, timeout=0.4))
+
+
+def test_server_error_is_raised(mock_client):
+    with pytest.raises(openai.InternalServerError):
+        list(stream_completion(mock_client(status=500), "mock", MESSAGES, timeout=5))
+
+
+def _long_history(summarizer):
+    history = ChatHistory(budget=80, keep_recent=2, summarizer=summarizer)
+    for i in range(6):
+        history.append("user", f"question {i} about the garden shed keys")
+        history.append("assistant", f"answer {i}: they are in the blue drawer")
+    return history
+
+
+def test_summary_uses_the_model(mock_client):
+    history = _long_history(llm_summarizer(mock_client, "mock"))
+    history.build()
+    assert history.summary.startswith("You said:")
+    assert history.summarized > 0
+
+
+def test_summary_falls_back_to_truncation_on_server_error(mock_client, capsys):
+    client = mock_client(status=503)
+    history = _long_history(llm_summarizer(lambda: client, "mock"))
+    messages = history.build()
+    assert "falling back to truncation" in capsys.readouterr().out
+    assert history.summary.startswith("user: question 0")
+    assert messages[-1] == {"role": "assistant", "content": "answer 5: they are in the blue drawer"}
+
+
+def test_make_client_requires_an_api_key(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_API_KEY", None)
+    with pytest.raises(llm.LLMNotConfigured, match="PMA_LLM_API_KEY"):
+        llm.make_client()
+    monkeypatch.setattr(llm, "LLM_API_KEY", "test")
+    assert llm.make_client().api_key == "test"
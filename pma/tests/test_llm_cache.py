@@ -0,0 +1,73 @@
+import time
+
+from conftest import make_db
+from llm_cache import ReplyCache, cache_key, context_hash
+from migrations import migrate
+
+MESSAGES = [{"role": "user", "content": "Where are my  keys?"}]
+
+
+def test_keys_ignore_whitespace_and_case_but_not_the_user_or_context():
+    key = cache_key("mock", MESSAGES, 1)
+    assert cache_key("mock", [{"role": "user", "content": "where are my keys?"}], 1) == key
+    assert cache_key("mock", MESSAGES, 2) != key
+    memories = [{'id': 1, 'title': "Keys", 'content': "blue drawer"}]
+    assert cache_key("mock", MESSAGES, 1, context_hash(memories)) != key
+    edited = [{'id': 1, 'title': "Keys", 'content': "red drawer"}]
+    assert context_hash(edited) != context_hash(memories)
+
+
+def test_replies_expire_after_the_ttl(tmp_path):
+    cache = ReplyCache(str(tmp_path / "replies.sqlite3"), ttl=0.05)
+    cache.put("k", 1, "blue drawer")
+    assert cache.get("k") == "blue drawer"
+    time.sleep(0.06)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_least_recently_used_replies_are_evicted_over_budget(tmp_path):
+    cache = ReplyCache(str(tmp_path / "replies.sqlite3"), max_bytes=20)
+    cache.put("a", 1, "x" * 8)
+    time.sleep(0.01)
+    cache.put("b", 1, "y" * 8)
+    time.sleep(0.01)
+    cache.get("a")
+    cache.put("c", 1, "z" * 8)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 8 and cache.get("c") == "z" * 8
+    assert cache.stats()["bytes"] == 16
+
+
+def test_memory_changes_drop_the_affected_users_replies(tmp_path):
+    cache = ReplyCache(str(tmp_path / "replies.sqlite3"))
+    db = make_db(tmp_path / "test.sqlite3", tmp_path / "blobs", listeners=[cache])
+    try:
+        migrate(db)
+        for name in ("alice", "bob", "carol"):
+            assert db.create_user(name, "secret")
+        alice, bob, carol = (db.get_user(n)['id'] for n in ("alice", "bob", "carol"))
+        assert db.link_family_member(bob, "alice")
+
+        def fill():
+            for user_id in (alice, bob, carol):
+                cache.put(f"reply-{user_id}", user_id, "cached")
+
+        def cached():
+            return {u for u in (alice, bob, carol) if cache.get(f"reply-{u}")}
+
+        fill()
+        db.add_data(alice, "othernote", "Keys", "blue drawer")
+        assert cached() == {carol}
+        fill()
+        db.delete_memory(db.get_user_data(alice)[0]['id'], alice)
+        assert cached() == {carol}
+        fill()
+        db.add_data_bulk([{'user_id': alice, 'data_type': "othernote", 'title': "Gym", 'content': "locker 4411"}])
+        assert cached() == {carol}
+        fill()
+        db.delete_all_user_data(alice)
+        assert cached() == {carol}
+    finally:
+        db.close()
@@ -0,0 +1,75 @@
+import pytest
+
+from conftest import make_db
+from memory_index import MemoryIndex, UserIndex
+from migrations import migrate
+
+
+def memory(memory_id, title, content):
+    return {'id': memory_id, 'title': title, 'data_type': "othernote", 'date': None, 'content': content}
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    index = MemoryIndex()
+    database = make_db(tmp_path / "indexed.sqlite3", tmp_path / "blobs", listeners=[index])
+    migrate(database)
+    ids = {}
+    for name in ("alice", "bob"):
+        assert database.create_user(name, "secret")
+        ids[name] = database.get_user(name)['id']
+    assert database.link_family_member(ids["bob"], "alice")
+    yield database, index, ids
+    database.close()
+
+
+def titles(results):
+    return [r['title'] for r in results]
+
+
+def test_user_index_add_remove_and_grow():
+    index = UserIndex([memory(i, f"note {i}", f"filler text {i}") for i in range(20)])
+    index.add(memory(100, "Car keys", "the car keys are in the blue drawer"))
+    index.add(memory(100, "Car keys", "added twice"))
+    assert index.size == 21 and len(index.ids) >= 21
+    assert titles(index.query("where are my car keys", k=1)) == ["Car keys"]
+    index.remove(100)
+    index.remove(100)
+    assert index.size == 20 and 100 not in index.docs
+    assert "Car keys" not in titles(index.query("where are my car keys"))
+    # the row swapped into the hole is still found
+    index.remove(0)
+    assert titles(index.query("note 19 filler text 19", k=1)) == ["note 19"]
+
+
+def test_index_follows_adds_and_deletes(indexed):
+    db, index, ids = indexed
+    db.add_data(ids["alice"], "othernote", "Car keys", "the car keys are in the blue drawer")
+    # built on the first search, then kept current by the listener hooks
+    assert titles(index.search(db, ids["bob"], "car keys")) == ["Car keys"]
+    db.add_data(ids["alice"], "othernote", "Passport", "passport is on the top shelf")
+    assert titles(index.search(db, ids["bob"], "passport top shelf", k=1)) == ["Passport"]
+    passport = next(m for m in db.get_user_data(ids["alice"]) if m['title'] == "Passport")
+    db.delete_memory(passport['id'], ids["alice"])
+    assert "Passport" not in titles(index.search(db, ids["bob"], "passport top shelf"))
+    assert "Passport" not in titles(index.search(db, ids["alice"], "passport top shelf"))
+
+
+def test_bulk_changes_rebuild_the_index(indexed):
+    db, index, ids = indexed
+    db.add_data(ids["alice"], "othernote", "Car keys", "the car keys are in the blue drawer")
+    assert titles(index.search(db, ids["alice"], "car keys")) == ["Car keys"]
+    db.add_data_bulk([{'user_id': ids["alice"], 'data_type': "othernote", 'title': "Gym", 'content': "gym locker code 4411"}])
+    assert index._get(ids["alice"]) is None and index._get(ids["bob"]) is None
+    assert titles(index.search(db, ids["bob"], "gym locker code", k=1)) == ["Gym"]
+    db.delete_all_user_data(ids["alice"])
+    assert index.search(db, ids["alice"], "car keys") == []
+    assert index.search(db, ids["bob"], "gym locker code") == []
+
+
+def test_least_recently_used_users_are_dropped(indexed):
+    db, _, ids = indexed
+    index = MemoryIndex(max_users=1)
+    index.search(db, ids["alice"], "keys")
+    index.search(db, ids["bob"], "keys")
+    assert index._get(ids["alice"]) is None and index._get(ids["bob"]) is not None
@@ -0,0 +1,114 @@
+import json
+import urllib.request
+
+import pytest
+
+import metrics
+from conftest import make_db
+from metrics import Histogram, QueryMetrics, SlowQueryLog, instrumented
+from migrations import migrate
+
+
+@instrumented(exclude=("skipped",))
+class Service:
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def ok(self):
+        with self.metrics.statement("SELECT 1") as stmt:
+            stmt.fetched([("a",), ("bc",)])
+        return "ok"
+
+    def outer(self):
+        return self.ok()
+
+    def broken(self):
+        raise ValueError("boom")
+
+    def skipped(self):
+        return "skipped"
+
+
+def test_histogram_quantiles_are_bucket_bounds():
+    h = Histogram((1, 10, 100))
+    for value in (0.5, 5, 5, 50, 500):
+        h.observe(value)
+    assert h.quantile(0.5) == 10 and h.quantile(0.8) == 100 and h.quantile(1.0) == float("inf")
+    assert h.cumulative() == [(1, 1), (10, 3), (100, 4), (float("inf"), 5)]
+    assert h.count == 5 and h.sum == 560.5
+
+
+def test_instrumented_counts_calls_errors_and_statements():
+    service = Service(QueryMetrics())
+    assert service.ok() == "ok" and service.outer() == "ok" and service.skipped() == "skipped"
+    with pytest.raises(ValueError):
+        service.broken()
+    snapshot = service.metrics.snapshot()["methods"]
+    assert set(snapshot) == {"ok", "outer", "broken"}
+    assert (snapshot["ok"]["calls"], snapshot["ok"]["statements"], snapshot["ok"]["rows"]) == (2, 2, 4)
+    # the nested ok() counts toward outer() too
+    assert (snapshot["outer"]["statements"], snapshot["outer"]["rows"], snapshot["outer"]["bytes"]) == (1, 2, 3)
+    assert (snapshot["broken"]["calls"], snapshot["broken"]["errors"]) == (1, 1)
+
+
+def test_slow_statements_are_logged_without_their_values(tmp_path):
+    path = tmp_path / "slow.jsonl"
+    service = Service(QueryMetrics(SlowQueryLog(threshold_ms=0, path=str(path))))
+    service.ok()
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(e["method"], e["sql"], e["rows"]) for e in entries] == [("ok", "SELECT 1", 2)]
+    assert service.metrics.snapshot()["slow_queries"] == 1
+
+
+def test_database_calls_are_recorded(db, users):
+    db.metrics.reset()
+    db.add_data(users["alice"], "othernote", "Keys", "blue drawer")
+    db.get_user_data(users["bob"])
+    snapshot = db.metrics.snapshot()["methods"]
+    assert snapshot["add_data"]["calls"] == 1 and snapshot["add_data"]["statements"] >= 1
+    assert snapshot["get_user_data"]["rows"] == 1 and snapshot["get_user_data"]["bytes"] > 0
+
+
+class Collector:
+    def stats(self):
+        return {"logins": 3}
+
+    def prometheus(self):
+        return ["pma_login_checks_total 3"]
+
+
+def test_prometheus_text_includes_methods_and_collectors():
+    service = Service(QueryMetrics())
+    service.metrics.register("logins", Collector())
+    service.ok()
+    with pytest.raises(ValueError):
+        service.broken()
+    text = service.metrics.prometheus()
+    lines = text.splitlines()
+    assert "# TYPE pma_db_call_seconds histogram" in lines
+    assert 'pma_db_call_seconds_bucket{method="ok",le="+Inf"} 1' in lines
+    assert 'pma_db_rows_sum{method="ok"} 2.0' in lines
+    assert 'pma_db_calls_total{method="broken"} 1' in lines
+    assert 'pma_db_errors_total{method="broken"} 1' in lines
+    assert 'pma_db_statements_total{method="ok"} 1' in lines
+    assert "pma_db_slow_queries_total 0" in lines
+    assert lines[-1] == "pma_login_checks_total 3" and text.endswith("\n")
+    assert service.metrics.snapshot()["logins"] == {"logins": 3}
+
+
+def test_metrics_are_served_over_http(tmp_path):
+    db = make_db(tmp_path / "test.sqlite3", tmp_path / "blobs")
+    server = metrics.serve(0, db.metrics)
+    try:
+        migrate(db)
+        db.get_user("nobody")
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(base + "/metrics.json") as response:
+            assert json.load(response)["methods"]["get_user"]["calls"] == 1
+        with urllib.request.urlopen(base + "/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert 'pma_db_calls_total{method="get_user"} 1' in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+        db.close()
@@ -0,0 +1,89 @@
+import migrations
+from conftest import make_db
+from migrations import _mysql_plan_problems, app_queries, check_indexes, migrate
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+        self.executed = None
+
+    def execute(self, sql, params=()):
+        self.executed = sql
+
+    def fetchall(self):
+        return self.plan
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, plan):
+        self.cursor_ = FakeCursor(plan)
+
+    def cursor(self, dictionary=False):
+        assert dictionary
+        return self.cursor_
+
+
+class FakePooled:
+    def __init__(self, plan):
+        self.conn = FakeConnection(plan)
+
+
+def mysql_problems(plan, ordered=False):
+    return _mysql_plan_problems(FakePooled(plan), "SELECT 1", (), ordered)
+
+
+def test_migrate_is_idempotent(db):
+    assert migrate(db) == []
+    with db.pool.connection() as pc:
+        assert migrations.applied_versions(pc) == {v for v, _, _ in migrations.SQLITE_MIGRATIONS}
+
+
+def test_hot_queries_use_indexes(db):
+    queries = migrations.HOT_QUERIES + app_queries(db)
+    assert check_indexes(db) == {name: [] for name, _, _, _ in queries}
+
+
+def test_app_queries_are_built_by_database(db):
+    sql, params = db._visible_sql(1, "SELECT id, title", limit=50)
+    assert app_queries(db)[0] == ("memories page", sql, params, False)
+    assert sql.count("FROM user_data") == 2
+
+
+def test_check_indexes_flags_missing_indexes(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrations, "SQLITE_MIGRATIONS", migrations.SQLITE_MIGRATIONS[:1])
+    db = make_db(tmp_path / "bare.sqlite3", tmp_path / "blobs")
+    try:
+        assert migrate(db) == [1]
+        problems = check_indexes(db)
+        assert problems["family members"] == ["full scan of f"]
+        assert problems["own memories page"] == ["sorts rows instead of reading them in index order"]
+    finally:
+        db.close()
+
+
+def test_mysql_plan_flags_full_scans_and_filesorts():
+    plan = [
+        {"id": 1, "select_type": "SIMPLE", "table": "user_data", "type": "ALL", "possible_keys": None, "Extra": "Using where; Using filesort"},
+    ]
+    assert mysql_problems(plan) == ["full scan of user_data (possible keys: none)"]
+    assert mysql_problems(plan, ordered=True) == ["full scan of user_data (possible keys: none)",
+                                                  "sorts user_data instead of reading it in index order"]
+
+
+def test_mysql_plan_accepts_index_reads():
+    plan = [
+        {"id": 1, "select_type": "PRIMARY", "table": "user_data", "type": "ref", "possible_keys": "idx_user_data_user_id",
+         "Extra": "Backward index scan"},
+        {"id": 2, "select_type": "UNION", "table": "memory_shares", "type": "ref", "possible_keys": "PRIMARY", "Extra": "Using index"},
+        {"id": 2, "select_type": "UNION", "table": "user_data", "type": "eq_ref", "possible_keys": "PRIMARY", "Extra": None},
+        # the UNION result, the INSERT target and plan-time lookups are not reads of a stored table
+        {"id": None, "select_type": "UNION RESULT", "table": "<union1,2>", "type": "ALL", "Extra": "Using temporary; Using filesort"},
+        {"id": 1, "select_type": "INSERT", "table": "memory_shares", "type": "ALL", "possible_keys": None, "Extra": None},
+        {"id": 1, "select_type": "SIMPLE", "table": None, "type": None, "Extra": "no matching row in const table"},
+        {"id": 1, "select_type": "SIMPLE", "table": "users", "type": "ALL", "Extra": "Impossible WHERE noticed after reading const tables"},
+    ]
+    assert mysql_problems(plan, ordered=True) == []
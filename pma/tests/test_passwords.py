@@ -0,0 +1,32 @@
+from passwords import LOGIN_METRICS, check_password, hash_password, hash_rounds
+
+
+def test_matching_hash_at_the_configured_cost_is_kept():
+    hashed = hash_password("secret", rounds=4)
+    assert hash_rounds(hashed) == 4
+    assert check_password("secret", hashed, rounds=4) == (True, None)
+    assert check_password("wrong", hashed, rounds=4) == (False, None)
+
+
+def test_login_rehashes_to_the_configured_cost():
+    before = LOGIN_METRICS.stats()
+    hashed = hash_password("secret", rounds=4)
+    ok, new_hash = check_password("secret", hashed, rounds=5)
+    assert ok and hash_rounds(new_hash) == 5
+    assert check_password("secret", new_hash, rounds=5) == (True, None)
+    # a wrong password never rehashes
+    assert check_password("wrong", hashed, rounds=5) == (False, None)
+    stats = LOGIN_METRICS.stats()
+    assert stats["logins"] - before["logins"] == 3
+    assert stats["rehashes"] - before["rehashes"] == 1
+    assert stats["failures"] - before["failures"] == 1
+
+
+def test_rehashed_password_is_stored_for_the_next_login(db, users):
+    user = db.get_user("alice")
+    ok, new_hash = check_password("secret", user['password_hash'], rounds=5)
+    assert ok and new_hash
+    db.update_password_hash(user['id'], "alice", new_hash)
+    stored = db.get_user("alice")['password_hash']
+    assert stored == new_hash
+    assert check_password("secret", stored, rounds=5) == (True, None)
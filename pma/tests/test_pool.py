@@ -0,0 +1,77 @@
+import pytest
+
+from backends import SQLiteBackend
+from pool import ConnectionPool, PoolError, PoolTimeout
+
+
+@pytest.fixture
+def pool(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "pool.sqlite3"))
+    pool = ConnectionPool(backend, size=2, timeout=0.05, ping_after=30.0, max_statements=2)
+    with pool.connection() as pc:
+        pc.conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        pc.conn.commit()
+    yield pool
+    pool.close()
+
+
+def test_connections_are_reused(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted(pool):
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    pool.release(held.pop())
+    held.append(pool.acquire())
+    for pc in held:
+        pool.release(pc)
+
+
+def test_prepared_cursors_are_cached_per_sql(pool):
+    with pool.connection() as pc:
+        a = pc.cursor("SELECT 1")
+        assert pc.cursor("SELECT 1") is a
+        pc.cursor("SELECT 2")
+        pc.cursor("SELECT 3")
+        # max_statements=2: the least recently used one was closed and dropped
+        assert list(pc.statements) == [("SELECT 2", False), ("SELECT 3", False)]
+        assert pc.cursor("SELECT 1") is not a
+
+
+def test_release_rolls_back_an_open_transaction(pool):
+    with pool.connection() as pc:
+        pc.conn.cursor().execute("INSERT INTO t (v) VALUES (%s)", ("uncommitted",))
+        assert pc.conn.in_transaction
+    with pool.connection() as pc:
+        cur = pc.conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM t")
+        assert cur.fetchone()[0] == 0
+
+
+def test_dead_idle_connection_is_replaced(pool):
+    pool.ping_after = 0.0
+    with pool.connection() as first:
+        pass
+    first.conn.close()
+    with pool.connection() as second:
+        assert second is not first
+        second.conn.ping()
+
+
+def test_on_acquire_reports_the_wait(pool):
+    waits = []
+    pool.on_acquire = waits.append
+    with pool.connection():
+        pass
+    assert len(waits) == 1 and waits[0] >= 0
+
+
+def test_closed_pool_refuses_checkouts(pool):
+    pool.close()
+    with pytest.raises(PoolError):
+        pool.acquire()
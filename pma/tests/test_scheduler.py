@@ -0,0 +1,145 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from pool import PoolTimeout
+from scheduler import ReminderScheduler
+
+NOW = datetime(2024, 5, 17, 9, 0)
+
+
+def add_reminder(db, user_id, title, at):
+    assert db.add_data(user_id, "medication", title, f"{title} dose", at.date(), at.strftime("%H:%M"))
+
+
+def pending(db, user_id):
+    return [(e['title'], e['due_at']) for e in db.get_pending_reminders(user_id)]
+
+
+def test_due_reminders_reach_the_owner_and_family(db, users):
+    at = NOW + timedelta(hours=1)
+    add_reminder(db, users["alice"], "Insulin", at)
+    scheduler = ReminderScheduler(db)
+    scheduler.refresh(NOW)
+    assert scheduler.fire_due(NOW) == []
+    assert len(scheduler.fire_due(at)) == 1
+    assert pending(db, users["alice"]) == pending(db, users["bob"]) == [("Insulin", at)]
+    assert pending(db, users["carol"]) == []
+
+
+def test_refresh_picks_up_new_memories_and_the_sliding_window(db, users):
+    scheduler = ReminderScheduler(db, horizon_days=1)
+    scheduler.refresh(NOW)
+    soon, later = NOW + timedelta(minutes=30), NOW + timedelta(days=3)
+    add_reminder(db, users["alice"], "Soon", soon)
+    add_reminder(db, users["alice"], "Later", later)
+    scheduler.refresh(NOW + timedelta(minutes=1))
+    assert [h[0] for h in scheduler.heap] == [soon]
+    scheduler.refresh(later - timedelta(hours=1))
+    assert sorted(h[0] for h in scheduler.heap) == [soon, later]
+
+
+def test_missed_reminders_outside_catch_up_are_dropped(db, users):
+    add_reminder(db, users["alice"], "Long ago", NOW - timedelta(hours=1))
+    add_reminder(db, users["alice"], "Just now", NOW - timedelta(minutes=2))
+    scheduler = ReminderScheduler(db)
+    scheduler.refresh(NOW)
+    assert [m for m, _ in scheduler.fire_due(NOW)] == [db.get_user_data(users["alice"])[0]['id']]
+
+
+def test_delivered_reminders_are_not_pending(db, users):
+    add_reminder(db, users["alice"], "Insulin", NOW)
+    scheduler = ReminderScheduler(db)
+    scheduler.refresh(NOW)
+    scheduler.fire_due(NOW)
+    # emitting again after a restart is a no-op
+    db.emit_reminder_events([(db.get_user_data(users["alice"])[0]['id'], NOW)])
+    events = db.get_pending_reminders(users["alice"])
+    assert len(events) == 1
+    db.mark_reminders_delivered(users["alice"], [events[0]['id']])
+    assert db.get_pending_reminders(users["alice"]) == []
+    assert len(db.get_pending_reminders(users["bob"])) == 1
+
+
+def test_rows_committed_out_of_id_order_are_found_by_the_rescan(db, users):
+    scheduler = ReminderScheduler(db, catch_up=timedelta(minutes=5))
+    add_reminder(db, users["alice"], "Placeholder", NOW + timedelta(days=30))
+    add_reminder(db, users["alice"], "Seen", NOW + timedelta(minutes=10))
+    seen_id = db.get_max_memory_id()
+    db.delete_memory(seen_id - 1, users["alice"])
+    scheduler.refresh(NOW)
+    # a transaction holding the lower id commits only now, after the scheduler moved past it
+    late = NOW + timedelta(minutes=3)
+    with db.pool.connection() as pc:
+        pc.conn.cursor().execute(
+            "INSERT INTO user_data (id, user_id, data_type, title, content, remind_at) VALUES (%s, %s, %s, %s, %s, %s)",
+            (seen_id - 1, users["carol"], "medication", "Late", "late dose", late))
+        pc.conn.commit()
+    scheduler.refresh(NOW + timedelta(seconds=30))
+    assert [m for _, m in scheduler.heap] == [seen_id]
+    scheduler.refresh(NOW + scheduler.rescan_every)
+    fired = scheduler.fire_due(late + timedelta(minutes=1))
+    assert fired == [(seen_id - 1, late)]
+    assert pending(db, users["carol"]) == [("Late", late)]
+
+
+def test_rescan_does_not_fire_a_reminder_twice(db, users):
+    at = NOW + timedelta(minutes=1)
+    add_reminder(db, users["alice"], "Insulin", at)
+    scheduler = ReminderScheduler(db)
+    scheduler.refresh(NOW)
+    assert len(scheduler.fire_due(at)) == 1
+    scheduler.refresh(at + scheduler.rescan_every)
+    assert scheduler.heap == [] and scheduler.fire_due(at + scheduler.rescan_every) == []
+
+
+def test_failed_emit_keeps_reminders_queued(db, users, monkeypatch):
+    add_reminder(db, users["alice"], "Insulin", NOW)
+    scheduler = ReminderScheduler(db)
+    scheduler.refresh(NOW)
+    emit = db.emit_reminder_events
+
+    def down(reminders):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(db, "emit_reminder_events", down)
+    with pytest.raises(sqlite3.OperationalError):
+        scheduler.fire_due(NOW)
+    assert len(scheduler.heap) == 1 and not scheduler.fired
+    # a rescan in the meantime doesn't queue it twice
+    scheduler.refresh(NOW + scheduler.rescan_every)
+    monkeypatch.setattr(db, "emit_reminder_events", emit)
+    assert len(scheduler.fire_due(NOW + scheduler.rescan_every)) == 1
+    assert pending(db, users["alice"]) == [("Insulin", NOW)]
+
+
+def test_run_survives_database_errors(db, users, monkeypatch, capsys):
+    at = datetime.now().replace(second=0, microsecond=0)
+    add_reminder(db, users["alice"], "Insulin", at)
+    scheduler = ReminderScheduler(db, retry_after=0.01)
+    max_id = db.get_max_memory_id
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise PoolTimeout("No free connection")
+        return max_id()
+
+    monkeypatch.setattr(db, "get_max_memory_id", flaky)
+    worker = threading.Thread(target=scheduler.run)
+    worker.start()
+    try:
+        for _ in range(200):
+            if db.get_pending_reminders(users["alice"]):
+                break
+            time.sleep(0.01)
+    finally:
+        scheduler.stop()
+        worker.join(5)
+    assert not worker.is_alive()
+    assert pending(db, users["alice"]) == [("Insulin", at)]
+    assert capsys.readouterr().out.count("retrying in") == 2
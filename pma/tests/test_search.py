@@ -0,0 +1,47 @@
+from datetime import date
+
+from database import date_range, fulltext_words
+
+
+def test_query_parsing():
+    assert date_range("2024-02") == (date(2024, 2, 1), date(2024, 2, 29))
+    assert date_range("2024-05-17") == (date(2024, 5, 17), date(2024, 5, 17))
+    assert date_range("2024-13") is None
+    assert fulltext_words("my gp is dr. Patel") == ["Patel"]
+
+
+def test_search_uses_the_fulltext_table(db, users):
+    db.add_data(users["alice"], "othernote", "Garden shed", "spare keys under the flower pot")
+    db.add_data(users["alice"], "othernote", "Gym", "locker code 4411")
+    assert [m['title'] for m in db.search(users["bob"], "flower po")] == ["Garden shed"]
+    assert [m['title'] for m in db.search(users["alice"], "Gy")] == ["Gym"]
+    assert db.search(users["carol"], "flower") == []
+
+
+def test_search_by_date(db, users):
+    db.add_data(users["alice"], "key_date", "Anniversary", "dinner booked", date(2024, 5, 17))
+    db.add_data(users["alice"], "key_date", "Birthday", "cake", date(2024, 6, 1))
+    assert [m['title'] for m in db.search(users["alice"], "2024-05")] == ["Anniversary"]
+    assert [m['title'] for m in db.search(users["bob"], "2024")] == ["Birthday", "Anniversary"]
+
+
+def test_ranked_search_pages_with_a_keyset_cursor(db, users):
+    for i in range(5):
+        db.add_data(users["alice"], "othernote", f"Receipt {i}", "receipt for the boiler service")
+    first = db.search(users["alice"], "boiler", limit=2)
+    seen = [m['id'] for m in first]
+    last = first[-1]
+    while True:
+        page = db.search(users["alice"], "boiler", limit=2, before_id=last['id'], before_score=last['score'])
+        if not page:
+            break
+        seen += [m['id'] for m in page]
+        last = page[-1]
+    assert sorted(seen) == sorted(m['id'] for m in db.get_user_data(users["alice"]))
+    assert len(set(seen)) == 5
+
+
+def test_like_fallback_escapes_wildcards(db, users):
+    db.add_data(users["alice"], "othernote", "50% off", "voucher")
+    db.add_data(users["alice"], "othernote", "500 club", "membership")
+    assert [m['title'] for m in db.search(users["alice"], "50%")] == ["50% off"]
@@ -0,0 +1,64 @@
+import json
+import threading
+
+import pytest
+
+from tracing import TRACER, JsonlExporter, Tracer, traced
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    # Database methods report to the process-wide TRACER, which is off unless PMA_TRACE=1
+    monkeypatch.setattr(TRACER, "enabled", True)
+    return TRACER
+
+
+def spans_by_name(trace):
+    return {s.name: s for s in trace.spans}
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+    with tracer.trace("rerun") as trace:
+        with tracer.span("page") as span:
+            assert trace is None and span is None
+
+
+def test_spans_nest_and_record_errors(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = Tracer(enabled=True, exporters=[JsonlExporter(str(path))])
+
+    @traced(tracer=tracer)
+    def home_page():
+        with tracer.span("chat", model="mock"):
+            raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        with tracer.trace("rerun", page="home") as trace:
+            home_page()
+    spans = spans_by_name(trace)
+    assert spans["home_page"].parent_id == trace.root.span_id
+    assert spans["chat"].parent_id == spans["home_page"].span_id
+    assert spans["chat"].attrs == {"model": "mock", "error": "ValueError"}
+    assert trace.root.attrs == {"page": "home", "error": "ValueError"}
+    assert [(r["name"], r["depth"]) for r in trace.waterfall()] == [("rerun", 0), ("home_page", 1), ("chat", 2)]
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert {r["trace_id"] for r in records} == {trace.trace_id} and len(records) == 3
+    # outside a trace, spans are no-ops
+    assert tracer.span("page").__enter__() is None
+
+
+def test_submitted_queries_nest_under_the_calling_span(db, users, tracer):
+    db.add_data(users["alice"], "othernote", "Keys", "blue drawer")
+    with tracer.trace("rerun") as trace:
+        with tracer.span("dashboard") as page:
+            memories, family = db.gather((db.get_user_data, users["bob"]), (db.get_family_members, users["bob"]))
+            # the workers' spans don't leak into the caller's context
+            with tracer.span("render") as render:
+                assert render.parent_id == page.span_id
+    assert [m['title'] for m in memories] == ["Keys"] and [f['username'] for f in family] == ["alice"]
+    spans = spans_by_name(trace)
+    for name in ("db.get_user_data", "db.get_family_members"):
+        assert spans[name].parent_id == page.span_id
+        assert spans[name].thread.startswith("db-query") and spans[name].thread != threading.current_thread().name
+    assert spans["db.get_user_data"].attrs["rows"] == 1
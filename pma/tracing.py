@@ -0,0 +1,161 @@
+# ✅ tracing.py - lightweight span tracing for a Streamlit rerun
+# rerun -> page function -> Database method / chat completion. Spans are kept in memory per
+# trace, written to a JSONL file when PMA_TRACE_FILE is set, and drawn as a waterfall by the
+# app's debug panel. Off unless PMA_TRACE=1 (or a trace file is configured); when off, or
+# outside a trace, span() costs one ContextVar lookup.
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+TRACE_FILE = os.getenv("PMA_TRACE_FILE")
+TRACE_ENABLED = os.getenv("PMA_TRACE", "1" if TRACE_FILE else "0") == "1"
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attrs", "thread")
+
+    def __init__(self, name, parent_id, attrs):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.end = None
+        self.attrs = attrs
+        self.thread = threading.current_thread().name
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def duration_ms(self):
+        return ((self.end or time.time()) - self.start) * 1000
+
+
+class Trace:
+    def __init__(self, name, attrs):
+        self.trace_id = uuid.uuid4().hex
+        self.root = Span(name, None, attrs)
+        self.spans = [self.root]
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        # spans arrive from Database.submit() worker threads too
+        with self._lock:
+            self.spans.append(span)
+
+    def waterfall(self):
+        # spans in start order with their depth and offset from the start of the trace
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        depth = {}
+        rows = []
+        for s in spans:
+            depth[s.span_id] = depth.get(s.parent_id, -1) + 1
+            rows.append({
+                "name": s.name,
+                "depth": depth[s.span_id],
+                "offset_ms": round((s.start - self.root.start) * 1000, 3),
+                "duration_ms": round(s.duration_ms, 3),
+                "thread": s.thread,
+                "attrs": dict(s.attrs),
+            })
+        return rows
+
+    def records(self):
+        with self._lock:
+            return [{
+                "trace_id": self.trace_id,
+                "span_id": s.span_id,
+                "parent_id": s.parent_id,
+                "name": s.name,
+                "start": s.start,
+                "duration_ms": round(s.duration_ms, 3),
+                "thread": s.thread,
+                "attrs": s.attrs,
+            } for s in self.spans]
+
+
+class JsonlExporter:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace):
+        lines = "".join(json.dumps(r, default=str) + "\n" for r in trace.records())
+        with self._lock, open(self.path, "a") as f:
+            f.write(lines)
+
+
+class Tracer:
+    def __init__(self, enabled=TRACE_ENABLED, exporters=()):
+        self.enabled = enabled
+        self.exporters = list(exporters)
+        self._current = contextvars.ContextVar("pma_span", default=None)
+
+    @contextmanager
+    def trace(self, name, **attrs):
+        # root span of one unit of work (a rerun); yields the Trace, or None when disabled
+        if not self.enabled:
+            yield None
+            return
+        trace = Trace(name, attrs)
+        token = self._current.set((trace, trace.root))
+        try:
+            yield trace
+        except BaseException as e:
+            # st.rerun() / st.stop() end a rerun with an exception too
+            trace.root.set(error=type(e).__name__)
+            raise
+        finally:
+            trace.root.end = time.time()
+            self._current.reset(token)
+            self._export(trace)
+
+    def span(self, name, **attrs):
+        current = self._current.get()
+        if current is None:
+            return nullcontext()
+        return self._span(current, name, attrs)
+
+    @contextmanager
+    def _span(self, current, name, attrs):
+        trace, parent = current
+        span = Span(name, parent.span_id, attrs)
+        trace.add(span)
+        token = self._current.set((trace, span))
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.end = time.time()
+            self._current.reset(token)
+
+    def _export(self, trace):
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                print("⚠️ Trace export failed:", e)
+
+
+TRACER = Tracer(exporters=[JsonlExporter(TRACE_FILE)] if TRACE_FILE else [])
+
+
+def traced(name=None, tracer=TRACER):
+    # decorator: run the function inside a span named after it
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate